@@ -1,28 +1,277 @@
+import ast
+import asyncio
+import time
+
+from budget import DEFAULT_LIMITS
 from inference_techniques import InferenceTechnique
+from math_answers import vote, canonicalize
+from planner import plan_question
+from utils import run_sync, normalize_text
+from tracing import span, traced, current_span
+
+# Question types with an expensive strategy that the cheap tier can skip
+CASCADE_TYPES = ("math", "commonsense", "future_prediction", "coding")
+
+# Distinct strategies raced concurrently per type. The first one is the primary:
+# it wins as soon as it returns a well-formed answer, so a race is never slower
+# than the primary alone. Coding is not raced: a draft that parses would always
+# beat self-refinement, which is just the cascade.
+RACE_STRATEGIES = {
+    "math": ("math_solver", "chain_of_thought", "direct"),
+    "commonsense": ("react", "chain_of_thought", "direct"),
+}
 
 class WorkingAgent:
-    def __init__(self):
+    # react_mode: "chain" (thought/action/observation/final calls) or "fused" (one structured call)
+    # cascade: try a cheap direct answer first, escalate only when its checks fail
+    # math_mode: "refine" (CoT + continuation) or "consistency" (parallel chains, equivalence voting)
+    # budget: optional budget.RunBudget that scales per-question limits over the run
+    # race: run RACE_STRATEGIES concurrently, keep the first answer two of them agree on
+    #       or the primary's answer once it is well-formed
+    def __init__(self, react_mode: str = "chain", cascade: bool = False, stats: dict | None = None,
+                 budget=None, math_mode: str = "refine", race: bool = False):
+        self.react_mode = react_mode
+        self.math_mode = math_mode
+        self.cascade = cascade
+        self.race = race
+        self.budget = budget
+        # Per-type counters, shared with forked agents
+        self.stats = stats if stats is not None else {}
+        self.last_run = None
+        # Per-question effort knobs (consistency samples, refinement iterations, ReAct actions)
+        self.limits = dict(DEFAULT_LIMITS)
         self.technique = InferenceTechnique(self)
 
-    def solve_and_answer(self, question):
+    def fork(self):
+        # Fresh agent with its own call counter, for running questions concurrently
+        return WorkingAgent(react_mode=self.react_mode, cascade=self.cascade, stats=self.stats,
+                            budget=self.budget, math_mode=self.math_mode, race=self.race)
+
+    async def asolve_and_answer(self, question):
+        calls_before = self.technique.call_counter
+        tokens_before = self.technique.token_counter
+        start = time.perf_counter()
+
+        with span("question") as sp:
+            qtype = await self.technique.aclassify_question(question)
+            print(f"++++Detected question type: {qtype} ++++")
+            sp.set(qtype=qtype)
+
+            if self.budget is not None:
+                self.limits = self.budget.limits(qtype)
+                self.technique.max_calls = calls_before + self.limits["max_calls"]
+                sp.set(scale=round(self.limits["scale"], 3))
 
-        qtype = self.technique.classify_question(question)
-        print(f"++++Detected question type: {qtype} ++++")
+            escalated = None
+            if self.race and qtype in RACE_STRATEGIES and not self.is_expression_task(question):
+                answer = await self.arace(question, qtype)
+            elif self.cascade and qtype in CASCADE_TYPES and not self.is_expression_task(question):
+                answer, escalated = await self.acascade(question, qtype)
+            else:
+                answer = await self.aroute(question, qtype)
 
+            calls = self.technique.call_counter - calls_before
+            sp.set(calls=calls, tokens=self.technique.token_counter - tokens_before, escalated=escalated)
+
+        self._record(qtype, escalated, calls)
+        if self.budget is not None:
+            self.budget.record(qtype, time.perf_counter() - start,
+                               self.technique.token_counter - tokens_before,
+                               scale=self.limits.get("scale", 1.0))
+        return answer
+
+    def _record(self, qtype, escalated, calls):
+        self.last_run = {"qtype": qtype, "escalated": escalated, "calls": calls}
+        row = self.stats.setdefault(qtype, {"questions": 0, "escalated": 0, "calls": 0})
+        row["questions"] += 1
+        row["escalated"] += int(bool(escalated))
+        row["calls"] += calls
+
+    async def aroute(self, question, qtype):
         # Route to appropriate domain-specific handler
         if qtype == "math":
-            return self.solve_math_question(question)
+            return await self.asolve_math_question(question)
         elif qtype == "commonsense":
-            return self.solve_commonsense_question(question)
+            return await self.asolve_commonsense_question(question)
         elif qtype == "future_prediction":
-            return self.solve_future_prediction_question(question)
+            return await self.asolve_future_prediction_question(question)
         elif qtype == "planning":
-            return self.solve_planning_question(question)
+            return await self.asolve_planning_question(question)
         elif qtype == "coding":
-            return self.solve_coding_question(question)
+            return await self.asolve_coding_question(question)
         else:
             print(f"Unknown question type '{qtype}', using default chain of thought")
-            return self.technique.chain_of_thought(question)
+            return await self.technique.achain_of_thought(question)
+
+    def solve_and_answer(self, question):
+        return run_sync(self.asolve_and_answer(question))
+
+    # Cheap-first cascade: returns (answer, escalated)
+    @traced("handler.cascade")
+    async def acascade(self, question, qtype):
+        if qtype == "coding":
+            code = await self.technique.achain_of_thought_coding(question)
+            if self.looks_like_code(code):
+                print("[Cascade] Code passed format check, skipping self-refinement")
+                return code, False
+            print("[Cascade] Code failed format check, escalating to self-refinement")
+            return await self.technique.aself_refinement_coding(
+                question, initial=code, max_iters=self.limits["max_iters"]), True
+
+        boxed = qtype == "future_prediction"
+        samples = await self.technique.adirect_samples(question, samples=2, boxed=boxed)
+        if self.samples_agree(samples, boxed=boxed, math=qtype == "math"):
+            print(f"[Cascade] Cheap samples agree: {samples[0]!r}")
+            return samples[0], False
+
+        print(f"[Cascade] Cheap samples disagree {samples!r}, escalating")
+        return await self.aroute(question, qtype), True
+
+    @staticmethod
+    def samples_agree(samples, boxed: bool = False, math: bool = False) -> bool:
+        if not samples or any(not s or s.startswith("ERROR") for s in samples):
+            return False
+        if boxed and not all(s.startswith("\\boxed{") for s in samples):
+            return False
+        # A short answer is expected; long replies mean the model ignored the format
+        if any(len(s) > 200 for s in samples):
+            return False
+        if math:
+            # 1/2, 0.5 and \frac{1}{2} count as agreeing
+            return vote(samples)[1] == len(samples)
+        return len({normalize_text(s) for s in samples}) == 1
+
+    @staticmethod
+    def looks_like_code(code: str) -> bool:
+        if not code or code.startswith("ERROR") or "def " not in code:
+            return False
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return False
+        return True
+
+    def _strategy(self, name, question):
+        if name == "math_solver":
+            return self.asolve_math_question(question)
+        if name == "react":
+            return self.asolve_commonsense_question(question)
+        if name == "chain_of_thought":
+            return self.technique.achain_of_thought(question)
+        if name == "direct":
+            return self._adirect(question)
+        raise ValueError(f"Unknown race strategy: {name}")
+
+    async def _adirect(self, question):
+        return (await self.technique.adirect_samples(question, samples=1))[0]
+
+    def race_accepts(self, qtype, name, answer) -> bool:
+        # Validator: the primary's answer is accepted without waiting for agreement
+        # once it is well-formed (short; numeric for math)
+        if name != RACE_STRATEGIES[qtype][0] or len(answer) > 200:
+            return False
+        if qtype == "math":
+            return canonicalize(answer)["value"] is not None
+        return True
+
+    # Speculative racing: returns as soon as two different strategies agree or
+    # the validator accepts one
+    @traced("handler.race")
+    async def arace(self, question, qtype):
+        names = RACE_STRATEGIES[qtype]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Race strategies must be distinct: {names}")
+
+        # Each strategy runs on its own fork, so one cannot use up another's call allowance
+        workers = {}
+        for name in names:
+            worker = self.fork()
+            worker.limits = self.limits
+            worker.technique.max_calls = self.limits["max_calls"]
+            workers[name] = worker
+        tasks = {asyncio.ensure_future(workers[name]._strategy(name, question)): name for name in names}
+        finished = []   # (name, answer) in completion order
+        errors = []
+        winner, how = None, "fallback"
+        try:
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        answer = task.result()
+                    except Exception as e:
+                        print(f"[Race] {tasks[task]} failed: {e}")
+                        errors.append(e)
+                        continue
+                    if not answer or answer.startswith("ERROR"):
+                        continue
+                    if self.race_accepts(qtype, tasks[task], answer):
+                        winner, how = (tasks[task], answer), "validated"
+                        break
+                    # The earlier finisher of an agreeing pair wins
+                    for other in finished:
+                        if self.samples_agree([other[1], answer], math=qtype == "math"):
+                            winner, how = other, "agreed"
+                            break
+                    if winner is not None:
+                        break
+                    finished.append((tasks[task], answer))
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Fold the forks' usage (cancelled ones included) back into this question
+            for worker in workers.values():
+                self.technique.call_counter += worker.technique.call_counter
+                self.technique.token_counter += worker.technique.token_counter
+                self.technique.prefix_reused_chars += worker.technique.prefix_reused_chars
+
+        if winner is None:
+            primary = [entry for entry in finished if entry[0] == names[0]]
+            winner = (primary or finished or [None])[0]
+            if winner is None:
+                if errors:
+                    raise errors[0]
+                return "ERROR: no strategy produced an answer"
+
+        print(f"[Race] {winner[0]} wins ({how})")
+        current_span().set(winner=winner[0], how=how)
+        row = self.stats.setdefault(qtype, {"questions": 0, "escalated": 0, "calls": 0})
+        wins = row.setdefault("race_wins", {})
+        wins[winner[0]] = wins.get(winner[0], 0) + 1
+        row[f"race_{how}"] = row.get(f"race_{how}", 0) + 1
+        return winner[1]
+
+    def race_report(self):
+        print(f"{'type':<20}{'races':>7}{'agreed':>8}{'valid':>7}{'fallbk':>8}  wins")
+        for qtype, row in sorted(self.stats.items()):
+            wins = row.get("race_wins")
+            if not wins:
+                continue
+            n = sum(wins.values())
+            share = ", ".join(f"{name} {count / n:.0%}" for name, count in
+                              sorted(wins.items(), key=lambda kv: -kv[1]))
+            print(f"{qtype:<20}{n:>7}{row.get('race_agreed', 0):>8}{row.get('race_validated', 0):>7}"
+                  f"{row.get('race_fallback', 0):>8}  {share}")
+
+    def cascade_report(self):
+        print(f"{'type':<20}{'questions':>10}{'escalated':>11}{'calls/q':>9}")
+        for qtype, row in sorted(self.stats.items()):
+            n = row["questions"] or 1
+            print(f"{qtype:<20}{row['questions']:>10}{row['escalated'] / n:>11.1%}{row['calls'] / n:>9.2f}")
+
+    async def asolve_many(self, questions, concurrency: int = 64):
+        # Each question gets its own forked agent; the semaphore caps in-flight questions
+        sem = asyncio.Semaphore(concurrency)
+
+        async def solve_one(question):
+            async with sem:
+                return await self.fork().asolve_and_answer(question)
+
+        return await asyncio.gather(*[solve_one(q) for q in questions])
+
+    def solve_many(self, questions, concurrency: int = 64):
+        return run_sync(self.asolve_many(questions, concurrency=concurrency))
 
     def is_expression_task(self, question: str) -> bool:
         q = question.lower()
@@ -35,49 +284,85 @@ class WorkingAgent:
         ])
 
     # math: use self-refinement as primary, with optional self-consistency verification
-    def solve_math_question(self, question):
+    @traced("handler.math")
+    async def asolve_math_question(self, question):
 
         print("\n===[Domain Handler] Using CoT and continuation prompting for math question===\n")
 
         if self.is_expression_task(question):
-            return self.technique.solve_expression_question(question)
+            return await self.technique.asolve_expression_question(question)
+        elif self.math_mode == "consistency":
+            return await self.technique.amath_consistency(question, samples=self.limits["samples"] + 1)
         else:
-            return self.technique.solve_math_question(question)
+            return await self.technique.asolve_math_question(question, max_iters=self.limits["max_iters"])
 
 
     # common_sense: use chain of thought as primary
-    def solve_commonsense_question(self, question):
+    @traced("handler.commonsense")
+    async def asolve_commonsense_question(self, question):
 
         print("\n===[Domain Handler] Using ReAct for commonsense question===\n")
 
-        cot_answer = self.technique.react(question)
+        max_actions = self.limits["react_actions"]
+        if self.react_mode == "fused":
+            return await self.technique.areact_fused(question, max_actions=max_actions)
+
+        cot_answer = await self.technique.areact(question, max_actions=max_actions)
 
         return cot_answer
 
     # future_prediction: use self-consistency as primary
-    def solve_future_prediction_question(self, question):
+    @traced("handler.future_prediction")
+    async def asolve_future_prediction_question(self, question):
         print("\n===[Domain Handler] Using Self-Consistency for FUTURE PREDICTION question===\n")
 
         # Primary: Self-consistency with more samples for better prediction
-        consistent_answer = self.technique.future_consistency(question, samples=4)
+        consistent_answer = await self.technique.afuture_consistency(question, samples=self.limits["samples"])
 
         return consistent_answer
 
-    # planning: use ReAct as primary
-    def solve_planning_question(self, question):
+    # planning: local search planner, LLM planning as fallback
+    @traced("handler.planning")
+    async def asolve_planning_question(self, question):
+
+        print("\n===[Domain Handler] Using local planner for PLANNING question===\n")
 
-        print("\n===[Domain Handler] Using ReAct for PLANNING question===\n")
+        # Search is CPU-bound, so keep it off the event loop
+        plan, status = await asyncio.to_thread(plan_question, question)
+        current_span().set(planner=status)
+        row = self.stats.setdefault("planning", {"questions": 0, "escalated": 0, "calls": 0})
+        row[f"planner_{status}"] = row.get(f"planner_{status}", 0) + 1
+        if plan is not None:
+            return plan
 
-        # Primary: ReAct
-        react_answer = self.technique.reasoning_via_planning(question)
+        print(f"[Planner] {status}, falling back to LLM planning")
+        react_answer = await self.technique.areasoning_via_planning(question)
 
         return react_answer
 
     # coding: use self-refinement as primary
-    def solve_coding_question(self, question):
+    @traced("handler.coding")
+    async def asolve_coding_question(self, question):
 
         print("[Domain Handler] Using Self-Refinement for CODING question")
 
-        refined_answer = self.technique.self_refinement_coding(question)
+        refined_answer = await self.technique.aself_refinement_coding(question, max_iters=self.limits["max_iters"])
 
         return refined_answer
+
+    # ---- Sync wrappers for the domain handlers ----
+
+    def solve_math_question(self, question):
+        return run_sync(self.asolve_math_question(question))
+
+    def solve_commonsense_question(self, question):
+        return run_sync(self.asolve_commonsense_question(question))
+
+    def solve_future_prediction_question(self, question):
+        return run_sync(self.asolve_future_prediction_question(question))
+
+    def solve_planning_question(self, question):
+        return run_sync(self.asolve_planning_question(question))
+
+    def solve_coding_question(self, question):
+        return run_sync(self.asolve_coding_question(question))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compare the default agent against the cheap-first cascade: per detected
+question type, report escalation rate, model calls per question and accuracy.
+
+Questions come from the development data ({domain, input, expected_output});
+if that file is missing, the small `tests` set from utils is used instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+from agent import WorkingAgent
+from utils import load_dev_data, loose_match, close_async_session
+
+
+DEV_DATA_PATH = Path("cse476_final_project_dev_data.json")
+MAX_QUESTIONS = 100
+CONCURRENCY = 16
+
+
+async def run_agent(cascade: bool, rows, concurrency: int) -> dict:
+    agent = WorkingAgent(cascade=cascade)
+    sem = asyncio.Semaphore(concurrency)
+    per_type = {}
+
+    async def solve_one(row):
+        async with sem:
+            worker = agent.fork()
+            got = await worker.asolve_and_answer(row["input"])
+            stats = per_type.setdefault(worker.last_run["qtype"], {"n": 0, "correct": 0})
+            stats["n"] += 1
+            stats["correct"] += int(loose_match(str(row.get("expected_output", "")), got))
+
+    await asyncio.gather(*[solve_one(r) for r in rows])
+    return {"agent": agent, "accuracy": per_type}
+
+
+def print_report(label: str, result: dict) -> None:
+    agent, accuracy = result["agent"], result["accuracy"]
+    total_q = sum(r["questions"] for r in agent.stats.values()) or 1
+    total_calls = sum(r["calls"] for r in agent.stats.values())
+
+    print(f"\n=== {label}: {total_calls / total_q:.2f} calls/question ===")
+    print(f"{'type':<20}{'questions':>10}{'escalated':>11}{'calls/q':>9}{'accuracy':>10}")
+    for qtype, row in sorted(agent.stats.items()):
+        n = row["questions"] or 1
+        acc = accuracy.get(qtype, {"n": 0, "correct": 0})
+        print(f"{qtype:<20}{row['questions']:>10}{row['escalated'] / n:>11.1%}"
+              f"{row['calls'] / n:>9.2f}{acc['correct'] / max(acc['n'], 1):>10.1%}")
+
+
+async def main_async() -> None:
+    rows = load_dev_data(DEV_DATA_PATH, limit=MAX_QUESTIONS)
+    try:
+        baseline = await run_agent(False, rows, CONCURRENCY)
+        cascade = await run_agent(True, rows, CONCURRENCY)
+    finally:
+        await close_async_session()
+
+    print_report("Baseline", baseline)
+    print_report("Cascade", cascade)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare the multi-call ReAct chain against the fused single-call mode on
+commonsense questions: wall-clock latency, model calls, tokens and accuracy.
+
+Questions come from the development data ({domain, input, expected_output});
+if that file is missing, the small `tests` set from utils is used instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+from statistics import mean, median
+
+from inference_techniques import InferenceTechnique
+from utils import load_dev_data, loose_match, close_async_session
+
+
+DEV_DATA_PATH = Path("cse476_final_project_dev_data.json")
+MAX_QUESTIONS = 50
+CONCURRENCY = 8
+
+
+async def run_mode(mode: str, questions, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def solve_one(question, expected):
+        async with sem:
+            technique = InferenceTechnique(None)
+            start = time.perf_counter()
+            if mode == "fused":
+                got = await technique.areact_fused(question)
+            else:
+                got = await technique.areact(question)
+            return {
+                "latency": time.perf_counter() - start,
+                "calls": technique.call_counter,
+                "tokens": technique.token_counter,
+                "correct": loose_match(expected, got),
+            }
+
+    rows = await asyncio.gather(*[solve_one(q, e) for q, e in questions])
+    return {
+        "mode": mode,
+        "n": len(rows),
+        "median_latency": median(r["latency"] for r in rows),
+        "mean_latency": mean(r["latency"] for r in rows),
+        "mean_calls": mean(r["calls"] for r in rows),
+        "mean_tokens": mean(r["tokens"] for r in rows),
+        "accuracy": sum(r["correct"] for r in rows) / len(rows),
+    }
+
+
+async def main_async() -> None:
+    rows = load_dev_data(DEV_DATA_PATH, domain="common", limit=MAX_QUESTIONS)
+    questions = [(r["input"], str(r.get("expected_output", ""))) for r in rows]
+    if not questions:
+        print("No commonsense questions found.")
+        return
+
+    try:
+        results = [await run_mode(mode, questions, CONCURRENCY) for mode in ("chain", "fused")]
+    finally:
+        await close_async_session()
+
+    print(f"\n=== ReAct benchmark ({len(questions)} commonsense questions) ===")
+    print(f"{'mode':<8}{'median s':>10}{'mean s':>10}{'calls':>8}{'tokens':>10}{'accuracy':>10}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['median_latency']:>10.2f}{r['mean_latency']:>10.2f}"
+              f"{r['mean_calls']:>8.2f}{r['mean_tokens']:>10.0f}{r['accuracy']:>10.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
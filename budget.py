@@ -0,0 +1,142 @@
+"""
+Run-level budget controller.
+
+Given a total wall-clock and/or token budget for a run, RunBudget tracks how many
+questions are left and what each question type has cost so far, and scales the
+per-question limits (consistency samples, refinement iterations, ReAct actions,
+call cap) so the run finishes on budget.
+
+Observed costs are stored per unit of scale and per type, so the projection
+stays valid while the scale moves and follows the type mix. Spare budget goes
+mostly to types where extra effort helps accuracy (GAIN) and is cheap; when over
+budget, expensive low-gain types are cut first.
+"""
+
+import threading
+import time
+
+DEFAULT_LIMITS = {"samples": 4, "max_iters": 2, "react_actions": 4, "max_calls": 20}
+
+LIMIT_BOUNDS = {
+    "samples": (1, 9),
+    "max_iters": (0, 4),
+    "react_actions": (1, 6),
+    "max_calls": (6, 40),
+}
+
+# How much extra effort is expected to help each question type (0..1)
+GAIN = {
+    "math": 1.0,
+    "future_prediction": 1.0,
+    "coding": 0.75,
+    "commonsense": 0.5,
+    "planning": 0.25,
+}
+
+# Questions observed before the controller starts moving away from scale 1.0
+WARMUP = 10
+
+
+class RunBudget:
+    def __init__(self, total_questions: int, seconds: float | None = None,
+                 tokens: int | None = None, concurrency: int = 1):
+        if seconds is None and tokens is None:
+            raise ValueError("RunBudget needs a seconds and/or tokens budget")
+        self.total_questions = total_questions
+        self.seconds = seconds
+        self.tokens = tokens
+        self.concurrency = max(concurrency, 1)
+
+        self.started = time.monotonic()
+        self.done = 0
+        self.tokens_used = 0
+        # qtype -> {"n", "seconds", "tokens"}, costs divided by the scale in effect
+        self.costs = {}
+        self._lock = threading.Lock()
+
+    def _unit_costs(self, key: str) -> dict | None:
+        """qtype -> observed cost per question at scale 1.0, or None during warm-up."""
+        if sum(c["n"] for c in self.costs.values()) < WARMUP:
+            return None
+        return {qtype: row[key] / row["n"] for qtype, row in self.costs.items()}
+
+    def _plan(self, key: str, remaining: float) -> tuple | None:
+        """(base scale, per-type scales) that spend `remaining` of `key` on the questions left.
+
+        The remaining questions follow the observed type mix. Extra effort is
+        weighted by gain per unit cost, so a cheap high-gain type gets more of it;
+        cuts are weighted by cost over gain, so expensive low-gain types shrink first.
+        """
+        costs = self._unit_costs(key)
+        if not costs:
+            return None
+        n = sum(row["n"] for row in self.costs.values())
+        remaining_q = max(self.total_questions - self.done, 1)
+        share = {qtype: row["n"] / n for qtype, row in self.costs.items()}
+        need = remaining_q * sum(share[t] * costs[t] for t in costs)
+        if not need:
+            return None
+        mean = need / remaining_q
+        if remaining >= need:
+            weight = {t: GAIN.get(t, 0.5) * mean / max(costs[t], mean * 0.01) for t in costs}
+        else:
+            weight = {t: (2.0 - GAIN.get(t, 0.5)) * costs[t] / mean for t in costs}
+        # Solve sum(questions_t * cost_t * (1 +/- k * weight_t)) == remaining for k
+        spread = remaining_q * sum(share[t] * costs[t] * weight[t] for t in costs)
+        k = abs(remaining - need) / spread if spread else 0.0
+        sign = 1.0 if remaining >= need else -1.0
+        return remaining / need, {t: max(1.0 + sign * k * weight[t], 0.0) for t in costs}
+
+    def _plans(self) -> list:
+        plans = []
+        if self.seconds is not None:
+            remaining = max(self.seconds - (time.monotonic() - self.started), 0.0)
+            plans.append(self._plan("seconds", remaining * self.concurrency))
+        if self.tokens is not None:
+            plans.append(self._plan("tokens", max(self.tokens - self.tokens_used, 0)))
+        return [plan for plan in plans if plan is not None]
+
+    def scale(self) -> float:
+        """Global effort multiplier: remaining budget / projected need at scale 1.0."""
+        return min((base for base, _ in self._plans()), default=1.0)
+
+    def type_scale(self, qtype: str) -> float:
+        scales = []
+        for base, per_type in self._plans():
+            if qtype in per_type:
+                scales.append(per_type[qtype])
+            else:
+                # Not observed yet: split the difference by gain alone
+                gain = GAIN.get(qtype, 0.5)
+                scales.append(1.0 + (base - 1.0) * gain if base >= 1.0
+                              else max(1.0 - (1.0 - base) * (2.0 - gain), 0.0))
+        return min(scales, default=1.0)
+
+    def limits(self, qtype: str) -> dict:
+        s = self.type_scale(qtype)
+        limits = {}
+        for name, default in DEFAULT_LIMITS.items():
+            low, high = LIMIT_BOUNDS[name]
+            limits[name] = min(max(round(default * s), low), high)
+        limits["scale"] = s
+        return limits
+
+    def record(self, qtype: str, seconds: float, tokens: int, scale: float = 1.0) -> None:
+        unit = max(scale, 0.1)
+        with self._lock:
+            self.done += 1
+            self.tokens_used += tokens
+            row = self.costs.setdefault(qtype, {"n": 0, "seconds": 0.0, "tokens": 0.0})
+            row["n"] += 1
+            row["seconds"] += seconds / unit
+            row["tokens"] += tokens / unit
+
+    def report(self) -> str:
+        elapsed = time.monotonic() - self.started
+        parts = [f"{self.done}/{self.total_questions} done", f"{elapsed:.0f}s elapsed",
+                 f"{self.tokens_used} tokens", f"scale={self.scale():.2f}"]
+        if self.seconds is not None:
+            parts.append(f"time budget {self.seconds:.0f}s")
+        if self.tokens is not None:
+            parts.append(f"token budget {self.tokens}")
+        return "[Budget] " + ", ".join(parts)
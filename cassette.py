@@ -0,0 +1,120 @@
+"""
+Record/replay cassettes for the chat-completions client.
+
+record: every request/response pair, failures (429, 5xx, timeouts) included,
+        is written to a JSONL file (gzip when the path ends in .gz), one line per
+        call. An existing file at the path is truncated first:
+        {"key": <sha256 of the request payload>, "elapsed": <seconds>, "result": {...}}
+replay: responses are served from the file with no network. Identical requests
+        (e.g. repeated temperature>0 samples) are served in recorded order.
+        latency scales the recorded elapsed time (0 = instant, 1 = as recorded).
+        strict raises CassetteMissError on an unmatched request; otherwise the
+        request falls through to the live endpoint.
+
+Enable with utils.use_cassette(path, mode) or the CASSETTE_PATH / CASSETTE_MODE
+(/ CASSETTE_STRICT / CASSETTE_LATENCY) environment variables.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+
+MODES = ("record", "replay")
+
+# Fields of the client's result dict worth keeping; headers are dropped to stay compact
+_RESULT_FIELDS = ("ok", "text", "raw", "status", "error", "finish_reason")
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+def request_key(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    def __init__(self, path, mode: str = "replay", strict: bool = False, latency: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {MODES}, got {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.strict = strict
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        self._index = defaultdict(list)   # key -> [(result, elapsed), ...] in recorded order
+        self._served = defaultdict(int)   # key -> how many responses were replayed
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            # Start fresh: stale entries would be replayed before the new ones
+            with _open(self.path, "w"):
+                pass
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            if self.strict:
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            return
+        with _open(self.path, "r") as fp:
+            for line in fp:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._index[entry["key"]].append((entry["result"], entry.get("elapsed", 0.0)))
+
+    def __len__(self):
+        return sum(len(v) for v in self._index.values())
+
+    def lookup(self, payload: dict):
+        """Replay mode: (result, delay_seconds) for this request, or None to go live."""
+        if self.mode != "replay":
+            return None
+
+        key = request_key(payload)
+        with self._lock:
+            entries = self._index.get(key)
+            n = self._served[key]
+            if not entries or n >= len(entries):
+                self.misses += 1
+                if self.strict:
+                    raise CassetteMissError(
+                        f"No recorded response #{n + 1} for request {key[:12]} in {self.path}")
+                return None
+            self._served[key] += 1
+            self.hits += 1
+
+        result, elapsed = entries[n]
+        return dict(result, headers={}), elapsed * self.latency
+
+    def record(self, payload: dict, result: dict, elapsed: float) -> None:
+        if self.mode != "record":
+            return
+        entry = {
+            "key": request_key(payload),
+            "elapsed": round(elapsed, 4),
+            "result": {k: result.get(k) for k in _RESULT_FIELDS},
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with _open(self.path, "a") as fp:
+                fp.write(line + "\n")
+            self.recorded += 1
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "entries": len(self), "hits": self.hits,
+                "misses": self.misses, "recorded": self.recorded}
@@ -0,0 +1,76 @@
+"""
+Multi-turn conversation state for follow-up calls.
+
+Instead of re-embedding the question and all prior output in a fresh prompt,
+follow-up turns (continuations, forced extraction, ReAct steps, code patches)
+are appended to one message history. Every request then starts with the exact
+messages of the previous one, so the server's prefix/KV cache can skip
+re-prefilling them. The session measures that reuse: how many characters of
+each request are a prefix of the request before it.
+"""
+
+DEFAULT_SYSTEM = "You are a helpful assistant."
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class ChatSession:
+    def __init__(self, system: str | None = None):
+        self.messages = [{"role": "system", "content": system or DEFAULT_SYSTEM}]
+        self._last_request = []
+        self.requests = 0
+        self.sent_chars = 0
+        self.reused_chars = 0
+        # finish_reason of the last reply ("stop", "length", ...)
+        self.finish_reason = None
+
+    def user(self, content: str) -> "ChatSession":
+        self.messages.append({"role": "user", "content": content})
+        return self
+
+    def assistant(self, content: str) -> "ChatSession":
+        self.messages.append({"role": "assistant", "content": content})
+        return self
+
+    def extend_last(self, text: str) -> "ChatSession":
+        # Append a continuation to the trailing assistant turn
+        self.messages[-1] = dict(self.messages[-1], content=self.messages[-1]["content"] + text)
+        return self
+
+    def request_messages(self) -> list:
+        """Messages for the next request; a trailing assistant turn is continued (prefill)."""
+        return list(self.messages)
+
+    def note_request(self, messages: list) -> int:
+        """Record a request; returns how many of its characters repeat the previous request's prefix."""
+        reused = 0
+        for i, msg in enumerate(messages):
+            if i >= len(self._last_request):
+                break
+            prev = self._last_request[i]
+            if prev["role"] != msg["role"]:
+                break
+            common = _common_prefix(prev["content"], msg["content"])
+            reused += common
+            if common < len(msg["content"]) or common < len(prev["content"]):
+                break
+
+        self._last_request = messages
+        self.requests += 1
+        self.sent_chars += sum(len(m["content"]) for m in messages)
+        self.reused_chars += reused
+        return reused
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused_chars / self.sent_chars if self.sent_chars else 0.0
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "sent_chars": self.sent_chars,
+                "reused_prefix_chars": self.reused_chars, "reuse_ratio": round(self.reuse_ratio, 3)}
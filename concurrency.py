@@ -0,0 +1,183 @@
+"""
+AIMD (additive-increase / multiplicative-decrease) concurrency limiter for
+model calls, so a run finds the shared server's throughput knee on its own.
+
+Every request takes a slot before it is sent. When a completion finishes while
+the limit was fully in use and latency is flat, the limit grows by about one
+per round of requests. It is multiplied by BACKOFF on:
+    rate_limited   HTTP 429
+    server_error   HTTP 5xx
+    timeout        connection errors / timeouts (status -1)
+    latency_spike  smoothed latency per token > SPIKE_RATIO x the baseline
+Decreases are spaced by at least one typical request latency, so one burst of
+failures counts once.
+
+Latency is compared per completion token (plus a fixed overhead for prefill),
+so a long code answer is not mistaken for queueing.
+
+Enable with utils.use_limiter() or ADAPTIVE_CONCURRENCY=1.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+
+BACKOFF = 0.7
+SPIKE_RATIO = 2.0
+# Token-equivalents added to each completion to cover prefill and network time
+OVERHEAD_TOKENS = 32
+# Per-completion upward drift of the latency baseline, so it can follow a slower mix
+BASELINE_DRIFT = 0.001
+
+
+def _reason(status) -> str | None:
+    if status == 429:
+        return "rate_limited"
+    if status == -1:
+        return "timeout"
+    if status is not None and status >= 500:
+        return "server_error"
+    return None
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 256):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial, min_limit), max_limit))
+
+        self.in_flight = 0
+        self.peak = 0
+        self.completed = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.reasons = Counter()   # reason -> number of limit changes it caused
+        self.history = []          # (seconds since start, limit, reason) per change
+
+        self._lock = threading.Lock()
+        self._waiters = deque()    # futures of queued acquire() calls, any event loop
+        self._started = time.monotonic()
+        self._baseline = None      # lowest smoothed seconds per token seen
+        self._smoothed = None
+        self._latency = 0.0        # smoothed request seconds, used as the decrease cooldown
+        self._last_decrease = 0.0
+
+    # ---- slots ----
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self._take()
+                return
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+
+        start = time.monotonic()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+                elif fut.done() and not fut.cancelled():
+                    # The slot was handed over just before cancellation
+                    self._give_back()
+            raise
+        self.wait_seconds += time.monotonic() - start
+
+    def release(self, seconds: float, result: dict | None) -> None:
+        """Return a slot; `result` is the client's result dict (None if the request was cancelled)."""
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            if result is not None:
+                self._feedback(seconds, result)
+            self._wake()
+
+    def _take(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def _give_back(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        # Called with the lock held: hand free slots to queued requests in order
+        while self._waiters and self.in_flight < int(self.limit):
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            self._take()
+            fut.get_loop().call_soon_threadsafe(self._grant, fut)
+
+    def _grant(self, fut):
+        if not fut.done():
+            fut.set_result(None)
+        else:
+            with self._lock:
+                self._give_back()
+
+    # ---- AIMD ----
+
+    def _feedback(self, seconds: float, result: dict):
+        status = result.get("status")
+        reason = _reason(status)
+        if reason is not None:
+            self.errors += 1
+            self._decrease(reason)
+            return
+        if status != 200:
+            return   # other 4xx errors say nothing about server load
+
+        usage = (result.get("raw") or {}).get("usage") or {}
+        per_token = seconds / ((usage.get("completion_tokens") or 0) + OVERHEAD_TOKENS)
+        if self._smoothed is None:
+            self._smoothed, self._latency = per_token, seconds
+        else:
+            self._smoothed = 0.8 * self._smoothed + 0.2 * per_token
+            self._latency = 0.8 * self._latency + 0.2 * seconds
+        if self._baseline is None:
+            self._baseline = self._smoothed
+        self._baseline = min(self._baseline * (1 + BASELINE_DRIFT), self._smoothed)
+
+        if self._smoothed > SPIKE_RATIO * self._baseline:
+            self._decrease("latency_spike")
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow when the current limit was actually reached
+            self._set_limit(self.limit + 1.0 / self.limit, "increase")
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self._latency:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * BACKOFF, reason, force=True)
+
+    def _set_limit(self, value: float, reason: str, force: bool = False):
+        old = int(self.limit)
+        self.limit = min(max(value, float(self.min_limit)), float(self.max_limit))
+        if int(self.limit) != old or force:
+            self.reasons[reason] += 1
+            self.history.append((round(time.monotonic() - self._started, 3), int(self.limit), reason))
+
+    # ---- metrics ----
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "peak_in_flight": self.peak,
+            "completed": self.completed,
+            "errors": self.errors,
+            "wait_seconds": round(self.wait_seconds, 2),
+            "baseline_ms_per_token": round(self._baseline * 1000, 2) if self._baseline else None,
+            "reasons": dict(self.reasons),
+        }
+
+    def report(self) -> str:
+        reasons = ", ".join(f"{k} x{v}" for k, v in self.reasons.most_common()) or "no changes"
+        return (f"[Concurrency] limit={int(self.limit)} (peak in flight {self.peak}), "
+                f"{self.completed} calls, {self.errors} errors; {reasons}")
@@ -0,0 +1,146 @@
+"""
+Near-duplicate question detection with MinHash + LSH.
+
+Built once over the question set before a run:
+- exact duplicates (same normalized text) are grouped so each is solved once,
+- near-duplicates (estimated Jaccard >= threshold over word/operator shingles) are
+  exposed so their solved answers can be reused as few-shot context. They can
+  still differ in a number, so only exact duplicates share answers.
+"""
+
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_question(text: str) -> str:
+    # Exact-duplicate form: only case and whitespace are normalized, since operators,
+    # signs and decimal points change the answer ("2+3" vs "2*3", "-5" vs "5")
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+# Shingle tokens: decimal numbers, words, and operators/signs as tokens of their own,
+# so "2+3" and "2*3" stay apart while other punctuation is ignored
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)?|\w+|[-+*/^=<>%]")
+
+
+def _shingle_text(text: str) -> str:
+    # Only used for near-duplicate shingles
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+
+def question_key(text: str) -> str:
+    return hashlib.sha1(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, k: int = 3) -> set:
+    words = _shingle_text(text).split()
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHashIndex:
+    def __init__(self, num_perm: int = 32, bands: int = 8, threshold: float = 0.8,
+                 bucket_scan: int = 32, seed: int = 476):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        # Templated questions fill a few huge buckets; only the newest entries are compared
+        self.bucket_scan = bucket_scan
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        self.keys = {}                      # idx -> exact-duplicate key
+        self.groups = defaultdict(list)     # key -> [idx, ...] in insertion order
+        self._shingles = {}                 # representative idx -> shingle set
+        self._buckets = defaultdict(list)   # (band, band signature) -> [representative idx]
+        self._near = defaultdict(set)       # representative idx -> near-duplicate representatives
+
+    def signature(self, shingle_set: set) -> list:
+        hashes = [_hash_shingle(s) for s in shingle_set]
+        return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in self._perms]
+
+    def add(self, idx, text: str) -> None:
+        key = question_key(text)
+        self.keys[idx] = key
+        self.groups[key].append(idx)
+        if len(self.groups[key]) > 1:
+            return  # exact duplicate: shares its representative's LSH entry
+
+        shingle_set = shingles(text)
+        self._shingles[idx] = shingle_set
+        sig = self.signature(shingle_set)
+
+        candidates = set()
+        for band in range(self.bands):
+            bucket = (band, tuple(sig[band * self.rows:(band + 1) * self.rows]))
+            candidates.update(self._buckets[bucket][-self.bucket_scan:])
+            self._buckets[bucket].append(idx)
+
+        # LSH only proposes candidates; confirm with the exact Jaccard similarity
+        for other in candidates:
+            if self.jaccard(idx, other) >= self.threshold:
+                self._near[idx].add(other)
+                self._near[other].add(idx)
+
+    def build(self, items) -> "MinHashIndex":
+        for idx, text in items:
+            self.add(idx, text)
+        return self
+
+    def representative(self, idx):
+        return self.groups[self.keys[idx]][0]
+
+    def duplicates(self, idx) -> list:
+        # Exact duplicates of idx, excluding idx itself
+        return [i for i in self.groups[self.keys[idx]] if i != idx]
+
+    def jaccard(self, a, b) -> float:
+        sa, sb = self._shingles[self.representative(a)], self._shingles[self.representative(b)]
+        inter = len(sa & sb)
+        return inter / max(len(sa) + len(sb) - inter, 1)
+
+    def near_duplicates(self, idx) -> list:
+        """Near-duplicate question indices of idx (all members of each group), most similar first."""
+        rep = self.representative(idx)
+        scored = sorted(((self.jaccard(rep, other), other) for other in self._near[rep]), reverse=True)
+        return [member for _, other in scored for member in self.groups[self.keys[other]]]
+
+    def cluster_key(self, idx):
+        # Smallest representative in the near-duplicate neighbourhood, for grouping
+        # related questions (not for sharing answers)
+        rep = self.representative(idx)
+        return min([rep, *self._near[rep]])
+
+    def few_shot_examples(self, idx, answers: dict, k: int = 2) -> list:
+        """Up to k (idx, answer) pairs from already-solved near-duplicates of idx."""
+        examples = []
+        for other in self.near_duplicates(idx):
+            if other in answers:
+                examples.append((other, answers[other]))
+            if len(examples) >= k:
+                break
+        return examples
+
+    def summary(self) -> dict:
+        total = len(self.keys)
+        unique = len(self.groups)
+        return {
+            "questions": total,
+            "unique": unique,
+            "exact_duplicates": total - unique,
+            "with_near_duplicates": sum(1 for rep in self._shingles if self._near[rep]),
+        }
@@ -11,10 +11,14 @@ an answers JSON file where each entry contains a string under the "output" key.
 
 from __future__ import annotations
 
+import asyncio
 import json
 from pathlib import Path
 from typing import Any, Dict, List
 from agent import WorkingAgent
+from budget import RunBudget
+from dedup import MinHashIndex
+from utils import close_async_session, use_limiter
 
 
 INPUT_PATH = Path("cse_476_final_project_test_data.json")
@@ -31,6 +35,43 @@ def load_questions(path: Path) -> List[Dict[str, Any]]:
 def is_placeholder(answer_text: str) -> bool:
     return answer_text.startswith("Placeholder answer")
 
+def question_text(question: Dict[str, Any]) -> str:
+    return question.get("input", "") or str(question)
+
+
+def build_dedup_index(questions: List[Dict[str, Any]], start_idx: int, end_idx: int) -> MinHashIndex:
+    index = MinHashIndex().build(
+        (idx, question_text(questions[idx - 1])) for idx in range(start_idx, end_idx + 1)
+    )
+    print(f"Dedup index: {index.summary()}")
+    return index
+
+
+def reuse_duplicate(index: MinHashIndex, answers: List[Dict[str, str]], idx: int):
+    # Copy the answer of an already-solved exact duplicate; returns its index, or None
+    rep = index.representative(idx)
+    if rep == idx or is_placeholder(answers[rep - 1]["output"]):
+        return None
+    answers[idx - 1] = dict(answers[rep - 1])
+    print(f"Reusing answer of Q{rep} for duplicate Q{idx}")
+    return rep
+
+
+def make_budget(n_questions: int, concurrency: int):
+    if TIME_BUDGET_SECONDS is None and TOKEN_BUDGET is None:
+        return None
+    print(f"Budget: {TIME_BUDGET_SECONDS}s / {TOKEN_BUDGET} tokens for {n_questions} questions")
+    return RunBudget(n_questions, seconds=TIME_BUDGET_SECONDS, tokens=TOKEN_BUDGET, concurrency=concurrency)
+
+
+def report_dedup(reused_from: Dict[int, int], calls_by_idx: Dict[int, int]) -> None:
+    if not reused_from:
+        return
+    avg_calls = sum(calls_by_idx.values()) / max(len(calls_by_idx), 1)
+    saved = sum(calls_by_idx.get(rep, avg_calls) for rep in reused_from.values())
+    print(f"Deduplication reused {len(reused_from)} answers, saving ~{saved:.0f} model calls "
+          f"({avg_calls:.2f} calls/question)")
+
 def load_answers(path: Path, total: int) -> List[Dict[str, str]]:
     if not path.exists():
         return [{"output": f"Placeholder answer for question {i+1}"} for i in range(total)]
@@ -48,7 +89,6 @@ def build_answers(questions: List[Dict[str, Any]],
                   start_idx: int,
                 end_idx: int) -> List[Dict[str, str]]:
     answers = []
-    agent = WorkingAgent()
 
     SAVE_EVERY = 30
 
@@ -59,6 +99,15 @@ def build_answers(questions: List[Dict[str, Any]],
     else:
         answers = []
 
+    index = build_dedup_index(questions, start_idx, end_idx) if DEDUPLICATE else None
+    reused_from, calls_by_idx = {}, {}
+
+    to_solve = [idx for idx in range(start_idx, end_idx + 1)
+                if is_placeholder(answers[idx - 1]["output"])
+                and (index is None or index.representative(idx) == idx)]
+    budget = make_budget(len(to_solve), 1)
+    agent = WorkingAgent(budget=budget)
+
     for idx in range(start_idx, end_idx + 1):
         current = answers[idx - 1]["output"]
 
@@ -66,15 +115,20 @@ def build_answers(questions: List[Dict[str, Any]],
             print(f"Skipping Q{idx} (already solved)")
             continue
 
+        if index is not None:
+            rep = reuse_duplicate(index, answers, idx)
+            if rep is not None:
+                reused_from[idx] = rep
+                continue
+
         try:
-            question_input = questions[idx - 1].get("input", "")
-            if not question_input:
-                question_input = str(questions[idx - 1])
+            question_input = question_text(questions[idx - 1])
 
             agent.technique.call_counter = 0
 
             real_answer = agent.solve_and_answer(question_input)
             answers[idx - 1] = {"output": real_answer}
+            calls_by_idx[idx] = agent.technique.call_counter
             print(f"Processed question {idx}/{len(questions)}")
 
         except Exception as e:
@@ -87,7 +141,78 @@ def build_answers(questions: List[Dict[str, Any]],
             with OUTPUT_PATH.open("w", encoding="utf-8") as f:
                 json.dump(answers, f, ensure_ascii=False, indent=2)
             print("Checkpoint saved.")
+            if budget is not None:
+                print(budget.report())
 
+    report_dedup(reused_from, calls_by_idx)
+    return answers
+
+
+async def abuild_answers(questions: List[Dict[str, Any]],
+                         start_idx: int,
+                         end_idx: int,
+                         concurrency: int,
+                         limiter=None) -> List[Dict[str, str]]:
+    """
+    Concurrent version of build_answers: up to `concurrency` questions are in
+    flight at once on a single event loop, each with its own forked agent.
+    With an adaptive `limiter`, model calls are further capped at its current limit.
+    """
+    answers = load_answers(OUTPUT_PATH, len(questions))
+
+    SAVE_EVERY = 30
+    sem = asyncio.Semaphore(concurrency)
+
+    index = build_dedup_index(questions, start_idx, end_idx) if DEDUPLICATE else None
+    reused_from, calls_by_idx = {}, {}
+
+    async def solve_one(idx: int):
+        async with sem:
+            question_input = question_text(questions[idx - 1])
+            worker = agent.fork()
+            try:
+                return idx, await worker.asolve_and_answer(question_input), worker.technique.call_counter
+            except Exception as e:
+                print(f"Error processing question {idx}: {e}")
+                return idx, f"Error processing question {idx}: {str(e)}", worker.technique.call_counter
+
+    pending = [idx for idx in range(start_idx, end_idx + 1)
+               if is_placeholder(answers[idx - 1]["output"])]
+    # Exact duplicates wait for their representative instead of being solved again
+    duplicates = []
+    if index is not None:
+        duplicates = [idx for idx in pending if index.representative(idx) != idx]
+        pending = [idx for idx in pending if index.representative(idx) == idx]
+    print(f"Solving {len(pending)} questions with concurrency={concurrency}")
+    budget = make_budget(len(pending), concurrency)
+    agent = WorkingAgent(budget=budget)
+
+    try:
+        for done, fut in enumerate(asyncio.as_completed([solve_one(i) for i in pending]), start=1):
+            idx, real_answer, calls = await fut
+            answers[idx - 1] = {"output": real_answer}
+            calls_by_idx[idx] = calls
+            print(f"Processed question {idx}/{len(questions)}")
+
+            if done % SAVE_EVERY == 0:
+                with OUTPUT_PATH.open("w", encoding="utf-8") as f:
+                    json.dump(answers, f, ensure_ascii=False, indent=2)
+                print("Checkpoint saved.")
+                if budget is not None:
+                    print(budget.report())
+                if limiter is not None:
+                    print(limiter.report())
+    finally:
+        await close_async_session()
+        if limiter is not None:
+            print(limiter.report())
+
+    for idx in duplicates:
+        rep = reuse_duplicate(index, answers, idx)
+        if rep is not None:
+            reused_from[idx] = rep
+
+    report_dedup(reused_from, calls_by_idx)
     return answers
 
 
@@ -115,10 +240,23 @@ def validate_results(
 
 START_INDEX = 1
 END_INDEX = 6208
+# Number of questions in flight at once; 1 keeps the original sequential loop
+CONCURRENCY = 1
+# Solve exact duplicate questions once and copy the answer
+DEDUPLICATE = True
+# Optional run-wide budgets; per-question effort is scaled to finish within them
+TIME_BUDGET_SECONDS = None
+TOKEN_BUDGET = None
+# Adapt in-flight model calls to the server (AIMD); pair with a high CONCURRENCY, e.g. 256
+ADAPTIVE_CONCURRENCY = False
 
 def main() -> None:
     questions = load_questions(INPUT_PATH)
-    answers = build_answers(questions, START_INDEX, END_INDEX)
+    if CONCURRENCY > 1:
+        limiter = use_limiter() if ADAPTIVE_CONCURRENCY else None
+        answers = asyncio.run(abuild_answers(questions, START_INDEX, END_INDEX, CONCURRENCY, limiter))
+    else:
+        answers = build_answers(questions, START_INDEX, END_INDEX)
 
     with OUTPUT_PATH.open("w", encoding="utf-8") as fp:
         json.dump(answers, fp, ensure_ascii=False, indent=2)
@@ -1,26 +1,172 @@
-from utils import call_model_chat_completions
+from utils import call_model_chat_completions_async, run_sync
+from chat_session import ChatSession, DEFAULT_SYSTEM
+from tracing import span, traced
+from math_answers import vote, clean_answer
+import tools
+import asyncio
 import re
 
+REACT_SECTIONS = ("THOUGHT", "ACTION", "OBSERVATION", "FINAL ANSWER")
+
+# Per call site: (max_tokens, continuations). A reply cut off by max_tokens
+# (finish_reason == "length") is continued up to `continuations` times, so short
+# answers reserve small generation slots without truncating long ones.
+TOKEN_PROFILES = {
+    "classify": (8, 0),
+    "extract": (48, 0),
+    "verdict": (64, 0),
+    "answer": (128, 0),
+    "forecast": (256, 1),
+    "react_step": (384, 1),
+    "plan": (600, 1),
+    "reasoning": (900, 2),
+    "code": (1500, 2),
+}
+
+CONTINUE_PROMPT = "Continue exactly from where you stopped. Do NOT repeat anything."
+
+
+def _parse_react_sections(text: str) -> dict | None:
+    # Split a fused ReAct response into its four sections; None if any is missing
+    pattern = r"^\s*\**\s*(THOUGHT|ACTION|OBSERVATION|FINAL ANSWER)\s*\**\s*:\s*\**\s*"
+    parts = re.split(pattern, text or "", flags=re.IGNORECASE | re.MULTILINE)
+
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(name.upper(), body.strip())
+
+    if any(not sections.get(name) for name in REACT_SECTIONS):
+        return None
+    return sections
+
+
 class InferenceTechnique:
+    # Flipped off the first time the server rejects continuing an assistant turn
+    prefill_supported = True
+
     def __init__(self, inference_technique):
         self.call_counter = 0
+        self.token_counter = 0
+        self.prefix_reused_chars = 0
         self.max_calls = 20
         self.inference_technique = inference_technique
 
-    def _call(self, prompt: str, temperature: float = 0.0, token: int = 800, system: str | None = None) -> str:
+    async def _arequest(self, prompt: str | None = None, temperature: float = 0.0, token: int = 800,
+                        system: str | None = None, messages: list | None = None,
+                        continuations: int = 0) -> dict:
         if self.call_counter >= self.max_calls:
-            return "ERROR: max call limit reached"
+            return {"ok": False, "text": None, "status": None, "error": "max call limit reached",
+                    "finish_reason": None}
         self.call_counter += 1
-        resp = call_model_chat_completions(
+        resp = await call_model_chat_completions_async(
             prompt,
-            system=system or "You are a helpful assistant.",
+            system=system or DEFAULT_SYSTEM,
             temperature=temperature,
+            messages=messages,
+            max_tokens=token,
         )
+        if resp.get("ok"):
+            self.token_counter += ((resp.get("raw") or {}).get("usage") or {}).get("total_tokens", 0)
+
+        if resp.get("ok") and resp.get("finish_reason") == "length" and continuations > 0:
+            resp = await self._acontinue(resp, prompt, temperature, token, system, messages, continuations)
+        return resp
+
+    async def _acontinue(self, resp: dict, prompt, temperature, token, system, messages, continuations) -> dict:
+        # Cut off by max_tokens: have the model continue its own partial reply
+        history = list(messages) if messages else [
+            {"role": "system", "content": system or DEFAULT_SYSTEM},
+            {"role": "user", "content": prompt},
+        ]
+        partial = resp.get("text") or ""
+        if history[-1]["role"] == "assistant":
+            # Already a prefill request: the reply extends the trailing assistant turn
+            history[-1] = dict(history[-1], content=history[-1]["content"] + partial)
+        else:
+            history.append({"role": "assistant", "content": partial})
+        if not self.prefill_supported:
+            history.append({"role": "user", "content": CONTINUE_PROMPT})
+
+        with span("auto_continue", partial_chars=len(partial), remaining=continuations - 1):
+            more = await self._arequest(messages=history, temperature=temperature, token=token,
+                                        continuations=continuations - 1)
+
+        if self.prefill_supported and self._prefill_rejected(more):
+            print("[Session] Server rejected assistant prefill, continuing with a user turn instead")
+            type(self).prefill_supported = False
+            return await self._acontinue(resp, prompt, temperature, token, system, messages, continuations)
+        if not more.get("ok"):
+            return resp
+        return dict(resp, text=partial + (more.get("text") or ""), finish_reason=more.get("finish_reason"))
+
+    @staticmethod
+    def _prefill_rejected(resp: dict) -> bool:
+        # Only a 400 naming the prefill options means continuation is unsupported;
+        # other 400s (e.g. context length) must not switch prefill off for the process
+        if resp.get("status") != 400:
+            return False
+        error = str(resp.get("error") or "")
+        return "continue_final_message" in error or "add_generation_prompt" in error
+
+    @staticmethod
+    def _text(resp: dict) -> str:
         if not resp.get("ok"):
+            if resp.get("status") is None:
+                return f"ERROR: {resp.get('error')}"
             return f"ERROR status={resp.get('status')} {resp.get('error')}"
         return (resp.get("text") or "").strip()
 
-    def classify_question(self, question):
+    async def _acall(self, prompt: str, temperature: float = 0.0, token: int = 800, system: str | None = None,
+                     profile: str | None = None) -> str:
+        token, continuations = TOKEN_PROFILES[profile] if profile else (token, 0)
+        return self._text(await self._arequest(prompt, temperature=temperature, token=token, system=system,
+                                               continuations=continuations))
+
+    def new_session(self, system: str | None = None) -> ChatSession:
+        return ChatSession(system)
+
+    async def _asend(self, session: ChatSession, content: str | None = None, temperature: float = 0.0,
+                     token: int = 800, continue_last: bool = False, profile: str | None = None) -> str:
+        """
+        Send the next turn of a session and append the reply to its history.
+        continue_last: have the model continue the trailing assistant turn (prefill)
+        instead of answering a new user message.
+        """
+        if content is not None:
+            session.user(content)
+        if continue_last and not self.prefill_supported:
+            session.user(CONTINUE_PROMPT)
+            continue_last = False
+        token, continuations = TOKEN_PROFILES[profile] if profile else (token, 0)
+
+        messages = session.request_messages()
+        reused = session.note_request(messages)
+        self.prefix_reused_chars += reused
+
+        with span("session_turn", turns=len(messages), reused_prefix_chars=reused):
+            resp = await self._arequest(messages=messages, temperature=temperature, token=token,
+                                        continuations=continuations)
+
+        if continue_last and self._prefill_rejected(resp):
+            print("[Session] Server rejected assistant prefill, continuing with a user turn instead")
+            type(self).prefill_supported = False
+            return await self._asend(session, temperature=temperature, token=token, continue_last=True,
+                                     profile=profile)
+
+        session.finish_reason = resp.get("finish_reason")
+        text = self._text(resp)
+        if continue_last and resp.get("ok"):
+            session.extend_last(resp.get("text") or "")
+        else:
+            session.assistant(text)
+        return text
+
+    def _call(self, prompt: str, temperature: float = 0.0, token: int = 800, system: str | None = None,
+              profile: str | None = None) -> str:
+        return run_sync(self._acall(prompt, temperature=temperature, token=token, system=system, profile=profile))
+
+    @traced("technique.classify_question")
+    async def aclassify_question(self, question):
         prompt = f"""
             Classify the following question into ONE category:
             - math (requires calculation, equations, numbers, mathematical reasoning)
@@ -37,30 +183,33 @@ class InferenceTechnique:
 
             """
 
-        result = self._call(
+        result = await self._acall(
             prompt,
             system="Return only one label: math, commonsense, future_prediction, coding, or planning.",
             temperature=0.0,
+            profile="classify",
         )
 
         return (result or "").strip().lower()
 
-    def future_consistency(self, question, samples=4):
-        predictions = []
-
-        for _ in range(samples):
-            response = self._call(
-                f"""
+    @traced("technique.future_consistency")
+    async def afuture_consistency(self, question, samples=4):
+        prompt = f"""
                     {question}
 
                     IMPORTANT:
                     Your final answer MUST end with this exact format:
                     \\boxed{{YOUR_PREDICTION}}
                     Do not add anything else.
-                    """,
-                temperature=0.8
-            )
+                    """
+
+        # Samples are independent, so draw them concurrently
+        responses = await asyncio.gather(*[
+            self._acall(prompt, temperature=0.8, profile="forecast") for _ in range(samples)
+        ])
 
+        predictions = []
+        for response in responses:
             answer = response.strip()
             if "\\boxed{" in answer:
                 answer = answer[answer.find("\\boxed{"):]  # remove extra text
@@ -79,44 +228,67 @@ class InferenceTechnique:
         return most_common
 
     # Used for commonsense
-    def react(self, question):
-        thought = self._call(
+    @traced("technique.react")
+    async def areact(self, question, max_actions: int = 4):
+        # One session: each step sees the earlier ones as history instead of re-embedded text
+        session = self.new_session()
+
+        thought = await self._asend(
+            session,
             f"You are an agent using the ReAct pattern.\n"
             f"THOUGHT: Think step-by-step about the question.\n"
             f"Do NOT answer yet.\n"
             f"QUESTION: {question}\n"
-            f"Respond with only your chain-of-thought as THOUGHT: ..."
+            f"Respond with only your chain-of-thought as THOUGHT: ...",
+            profile="react_step",
         )
 
-        action = self._call(
-            f"Based on the THOUGHT:\n{thought}\n\n"
-            f"Proceed to perform an ACTION to help answer the question and retrieve all RELEVANT contexts TO that question.\n"
+        action = await self._asend(
+            session,
+            f"Based on the THOUGHT above, proceed to perform an ACTION to help answer the question and retrieve all RELEVANT contexts TO that question.\n"
             f"Action should be done in many subjects in the question."
-            f" Recommended amount of action is 2, maximum amount of action is 4\n"
-            f"Some examples of ACTIONS you can take are: Search[query], Calculate[equation], Lookup[topic].\n"
+            f" Recommended amount of action is {min(2, max_actions)}, maximum amount of action is {max_actions}\n"
+            f"Some examples of ACTIONS you can take are: Search[query], Calculate[equation], Lookup[topic].\n",
+            profile="react_step",
         )
 
         # print(f"[React] thought: {thought}\n")
         # print(f"[React] action: {action}\n")
 
-        observation = self._call(
-            f"Based on context from {action}.\n"
-            f"for answering the QUESTION: {question}\n"
-            f"Perform those ACTIONS."
-            f"Then perform any observations or calculations needed. Avoid false facts.\n"
-            f"If direct action does not give enough info to determine the answer, then a logical deduction must be done.\n"
-            f"Do NOT give final answer yet.\n"
-        )
+        # Run the actions locally; the model only performs the ones no tool could answer.
+        # FTS5 queries on a large index are slow, so keep them off the event loop
+        with span("react_tools") as sp:
+            results = await asyncio.to_thread(tools.execute, action, max_actions=max_actions)
+            known = [(call, r) for call, r in results if r is not None]
+            sp.set(actions=len(results), hits=len(known))
+
+        observed = ""
+        if known:
+            observed = "OBSERVATION (results of the ACTIONS above):\n" + "\n".join(
+                f"{call} -> {r}" for call, r in known) + "\n\n"
+
+        if not results or len(known) < len(results):
+            remaining = "the remaining ACTIONS above (those without a result)" if known else "the ACTIONS above"
+            observation = await self._asend(
+                session,
+                f"{observed}"
+                f"For answering the QUESTION, perform {remaining}.\n"
+                f"Then perform any observations or calculations needed. Avoid false facts.\n"
+                f"If direct action does not give enough info to determine the answer, then a logical deduction must be done.\n"
+                f"Do NOT give final answer yet.\n",
+                profile="react_step",
+            )
+            observed = ""   # already part of the session history
 
-        final = self._call(
-            f"QUESTION: {question}\n"
-            f"THOUGHT: {thought}\n"
-            f"ACTION: {action}\n"
-            f"OBSERVATION: {observation}\n"
-            f"Now give ONLY a brief final answer."
+        final = await self._asend(
+            session,
+            f"{observed}"
+            f"Using the THOUGHT, ACTION and OBSERVATION above, "
+            f"now give ONLY a brief final answer."
             f"No need for a full sentence answer."
             f"If it is a name, give full name."
-            f"Do not include chain-of-thought or steps."
+            f"Do not include chain-of-thought or steps.",
+            profile="answer",
         )
 
         # print(f"[React] observation: {observation}\n")
@@ -124,9 +296,36 @@ class InferenceTechnique:
 
         return final
 
+    # Fused ReAct: all four sections in one response, final answer parsed locally
+    @traced("technique.react_fused")
+    async def areact_fused(self, question, max_actions: int = 4):
+        response = await self._acall(
+            f"You are an agent using the ReAct pattern.\n"
+            f"QUESTION: {question}\n\n"
+            f"Respond in ONE message with exactly these four sections, in this order:\n"
+            f"THOUGHT: Think step-by-step about the question.\n"
+            f"ACTION: Actions that retrieve all RELEVANT contexts to the question, one per line, "
+            f"such as Search[query], Calculate[equation], Lookup[topic]. "
+            f"Recommended amount of action is {min(2, max_actions)}, maximum amount of action is {max_actions}.\n"
+            f"OBSERVATION: The results of those actions, plus any calculation or logical deduction needed. "
+            f"Avoid false facts.\n"
+            f"FINAL ANSWER: ONLY a brief final answer. No need for a full sentence answer. "
+            f"If it is a name, give full name.\n",
+            profile="reasoning",
+        )
+
+        sections = _parse_react_sections(response)
+        if sections is None:
+            print("[React-Fused] Could not parse sections, falling back to multi-call ReAct")
+            return await self.areact(question, max_actions=max_actions)
+
+        return sections["FINAL ANSWER"].splitlines()[0].strip()
+
     # First technique for solving math problem: chain of thought
     # Output is step by step solution
-    def chain_of_thought_math(self, question: str) -> str:
+    @traced("technique.chain_of_thought_math")
+    async def achain_of_thought_math(self, question: str, temperature: float = 0.2,
+                                     session: ChatSession | None = None) -> str:
         prompt = f"""
             You are a professional mathematician. Be concise and strictly symbolic.
 
@@ -150,7 +349,10 @@ class InferenceTechnique:
             Remember: Output must follow the exact format above.
         """
         # Lower temperature for deterministic math outputs
-        cot = self._call(prompt, temperature=0.2)
+        if session is not None:
+            cot = await self._asend(session, prompt, temperature=temperature, profile="reasoning")
+        else:
+            cot = await self._acall(prompt, temperature=temperature, profile="reasoning")
 
         # If model failed to follow format, try to salvage by forcing minimal cleanup
         if "Step 1:" not in cot and "Final Answer:" in cot:
@@ -163,8 +365,11 @@ class InferenceTechnique:
         return cot.strip()
 
     # Based on chain_of_thought_math, iteratively refine until solved
-    def solve_math_question(self, question, max_iters: int = 2):
-        full_solution = self.chain_of_thought_math(question)
+    @traced("technique.solve_math_question")
+    async def asolve_math_question(self, question, max_iters: int = 2):
+        # Continuations and forced extraction extend this conversation instead of re-sending it
+        session = self.new_session()
+        full_solution = await self.achain_of_thought_math(question, session=session)
         print(f"[Solver] Initial output:\n{full_solution}\n")
 
         for i in range(max_iters):
@@ -174,23 +379,13 @@ class InferenceTechnique:
                 print(f"[Solver] Solved at iteration {i} ✔\n")
                 break
 
-            continue_prompt = f"""
-                Continue solving from the last step.
-
-                RULES:
-                - Do NOT repeat any step.
-                - Continue numbering exactly.
-                - Remember to follow the OUTPUT FORMAT strictly.
-                  Final Answer: <number, or exponential expression, or square root, or fraction>
-
-                QUESTION:
-                {question}
-
-                PARTIAL SOLUTION:
-                {full_solution}
-                """
+            # The model stopped on its own without a Final Answer line; continuing
+            # would not add one, so go straight to forced extraction
+            if session.finish_reason != "length":
+                break
 
-            continuation = self._call(continue_prompt, temperature=0.2)
+            # Still truncated after auto-continuation: pick up exactly where it stopped
+            continuation = await self._asend(session, temperature=0.2, continue_last=True, profile="reasoning")
             #print(f"[Continuation] Iter {i + 1} - Output:\n{continuation}\n")
 
             # Append continuation
@@ -208,13 +403,7 @@ class InferenceTechnique:
             You must output ONLY ONE LINE:
             Final Answer: <result>
 
-            Using the partial work below.
-
-            QUESTION:
-            {question}
-
-            PARTIAL SOLUTION:
-            {full_solution}
+            Using the partial work above.
 
             RULES:
             - Do NOT explain.
@@ -223,7 +412,7 @@ class InferenceTechnique:
               Final Answer: <result>
             """
 
-            forced = self._call(force_prompt, temperature=0.0)
+            forced = await self._asend(session, force_prompt, temperature=0.0, profile="extract")
             #print(f"[Solver] Forced Final Output:\n{forced}\n")
 
             full_solution = full_solution.rstrip() + "\n" + forced.strip()
@@ -254,12 +443,43 @@ class InferenceTechnique:
         ANSWER:
         """
 
-        final_answer = self._call(extract_prompt, temperature=0.0).strip()
+        final_answer = (await self._acall(extract_prompt, temperature=0.0, profile="extract")).strip()
 
         print(f"[Solver] Final Answer used: {final_answer}\n")
         return final_answer
 
-    def solve_expression_question(self, question: str) -> str:
+    # Self-consistency for math: K chains in parallel, vote over equivalent answers
+    @traced("technique.math_consistency")
+    async def amath_consistency(self, question, samples: int = 5, temperature: float = 0.7):
+        tasks = [asyncio.ensure_future(self.achain_of_thought_math(question, temperature=temperature))
+                 for _ in range(samples)]
+        answers = []
+        try:
+            for fut in asyncio.as_completed(tasks):
+                solution = await fut
+                m_ans = re.search(r"Final Answer\s*:\s*\**\s*(?:\n+)?([^\n]+)", solution, re.IGNORECASE)
+                if m_ans and m_ans.group(1).strip():
+                    answers.append(m_ans.group(1).strip())
+
+                # Stop once one class holds a strict majority of all K samples
+                best, count, _ = vote(answers)
+                if count > samples // 2:
+                    print(f"[Math-Consistency] Majority {count}/{samples} after {len(answers)} chains")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if not answers:
+            print("[Math-Consistency] No chain produced a Final Answer, falling back to solver")
+            return await self.asolve_math_question(question)
+
+        best, count, classes = vote(answers)
+        print(f"[Math-Consistency] Classes: {classes} -> {best!r}")
+        return clean_answer(best)
+
+    @traced("technique.solve_expression_question")
+    async def asolve_expression_question(self, question: str) -> str:
 
         prompt = f"""
             You are a professional mathematician. Solve the following problem STEP BY STEP by forming a valid mathematical expression.
@@ -279,26 +499,28 @@ class InferenceTechnique:
             FINAL OUTPUT:
             """
 
-        answer = self._call(prompt, temperature=0.0).strip()
+        answer = (await self._acall(prompt, temperature=0.0, profile="answer")).strip()
         return answer
 
     # Refining CoT for better answer
-    def self_refinement_coding(self, question):
-        answer = self.chain_of_thought_coding(question)
+    @traced("technique.self_refinement_coding")
+    async def aself_refinement_coding(self, question, initial: str | None = None, max_iters: int = 2):
+        # Reviewer and patcher turns extend the generation conversation, so the
+        # question and current code are never re-sent as fresh prompt text
+        session = self.new_session()
+        if initial:
+            session.user(self._coding_prompt(question)).assistant(initial)
+            answer = initial
+        else:
+            answer = await self.achain_of_thought_coding(question, session=session)
         print(f"[Self-Refinement] Initial Answer:\n{answer}\n")
 
-        for i in range(2):
+        for i in range(max_iters):
             verifier_prompt = f"""
-        You are a strict code reviewer.
+        You are now a strict code reviewer.
 
         TASK:
-        Check if the following code fully satisfies the specification.
-
-        QUESTION:
-        {question}
-
-        CODE:
-        {answer}
+        Check if the latest code above fully satisfies the specification in the QUESTION.
 
         OUTPUT FORMAT (STRICT — ONE LINE ONLY):
 
@@ -314,7 +536,7 @@ class InferenceTechnique:
 
         NO explanation. NO bullets. ONE line only.
         """
-            critique = self._call(verifier_prompt, temperature=0.0)
+            critique = await self._asend(session, verifier_prompt, temperature=0.0, profile="verdict")
             #print(f"[Self-Refinement] Iteration {i + 1} - Critique:\n{critique}\n")
 
             # Stop if correct
@@ -326,23 +548,14 @@ class InferenceTechnique:
             patch_prompt = f"""
         You are in CORRECTION MODE.
 
-        QUESTION:
-        {question}
-
-        CURRENT CODE:
-        {answer}
-
-        CRITIQUE:
-        {critique}
-
         INSTRUCTIONS:
-        - Apply ONLY the fix described in the critique.
+        - Apply ONLY the fix described in the critique above to the latest code.
         - Do NOT rewrite the entire solution.
         - Do NOT change working logic.
         - Preserve the exact function signature.
         - Output ONLY corrected Python code.
         """
-            refined = self._call(patch_prompt, temperature=0.0)
+            refined = await self._asend(session, patch_prompt, temperature=0.0, profile="code")
             print(f"[Self-Refinement] Iteration {i + 1} - Refined Code:\n{refined}\n")
 
             # ---- SAFETY UPDATE ----
@@ -355,9 +568,9 @@ class InferenceTechnique:
         print(f"[Self-Refinement] Final Code Used:\n{answer}\n")
         return answer
 
-    # CoT for coding problems
-    def chain_of_thought_coding(self, question: str) -> str:
-        prompt = f"""
+    @staticmethod
+    def _coding_prompt(question: str) -> str:
+        return f"""
             You are a professional Python developer.
 
             TASK:
@@ -375,12 +588,21 @@ class InferenceTechnique:
             QUESTION:
             {question}
             """
-        code = self._call(prompt, temperature=0.25)
+
+    # CoT for coding problems
+    @traced("technique.chain_of_thought_coding")
+    async def achain_of_thought_coding(self, question: str, session: ChatSession | None = None) -> str:
+        prompt = self._coding_prompt(question)
+        if session is not None:
+            code = await self._asend(session, prompt, temperature=0.25, profile="code")
+        else:
+            code = await self._acall(prompt, temperature=0.25, profile="code")
         return code.strip()
 
     # Analogical reasoning to solve planning problems
-    def reasoning_via_planning(self, question, max_steps=10):
-        response = self._call(
+    @traced("technique.reasoning_via_planning")
+    async def areasoning_via_planning(self, question, max_steps=10):
+        response = await self._acall(
             f"""
             You are an expert logistics planner.
             You must output a VALID PLAN that achieves the goal using ONLY the given actions.
@@ -399,7 +621,8 @@ class InferenceTechnique:
 
             Output ONLY the plan, one action per line.
             """,
-            temperature=0.7
+            temperature=0.7,
+            profile="plan",
         )
 
         # keep only lines with '(' and ')', strip extra spaces
@@ -415,3 +638,90 @@ class InferenceTechnique:
         # print(plan)
 
         return plan
+
+    # Cheap tier for the cascade: short direct answers, sampled concurrently
+    @traced("technique.direct_samples")
+    async def adirect_samples(self, question, samples: int = 2, temperature: float = 0.2, boxed: bool = False):
+        if boxed:
+            answer_format = "End with this exact format and nothing else: \\boxed{YOUR_PREDICTION}"
+        else:
+            answer_format = "Reply with ONLY the final answer, nothing else."
+        prompt = f"""
+            {question}
+
+            IMPORTANT:
+            {answer_format}
+            """
+
+        responses = await asyncio.gather(*[
+            self._acall(prompt, temperature=temperature, profile="answer",
+                        system="You are a careful solver. Reply ONLY with the final answer.")
+            for _ in range(samples)
+        ])
+        answers = []
+        for response in responses:
+            answer = response.strip()
+            if boxed and "\\boxed{" in answer:
+                # Same trimming as future_consistency: drop any lead-in before the box
+                answer = answer[answer.find("\\boxed{"):].splitlines()[0].strip()
+            answers.append(answer)
+        return answers
+
+    # Generic chain of thought, used when the question type is unknown
+    @traced("technique.chain_of_thought")
+    async def achain_of_thought(self, question: str) -> str:
+        prompt = f"""
+            Think step by step, then give the answer.
+
+            QUESTION:
+            {question}
+
+            OUTPUT FORMAT (MANDATORY):
+            <short reasoning>
+            Final Answer: <answer only>
+            """
+        response = await self._acall(prompt, temperature=0.0, profile="reasoning")
+
+        m_ans = re.search(r"Final Answer\s*:\s*([^\n]+)", response, re.IGNORECASE)
+        return m_ans.group(1).strip() if m_ans else response.strip()
+
+    # ---- Sync wrappers: keep the original blocking API working ----
+
+    def classify_question(self, question):
+        return run_sync(self.aclassify_question(question))
+
+    def future_consistency(self, question, samples=4):
+        return run_sync(self.afuture_consistency(question, samples=samples))
+
+    def react(self, question, max_actions: int = 4):
+        return run_sync(self.areact(question, max_actions=max_actions))
+
+    def react_fused(self, question, max_actions: int = 4):
+        return run_sync(self.areact_fused(question, max_actions=max_actions))
+
+    def chain_of_thought_math(self, question: str, temperature: float = 0.2) -> str:
+        return run_sync(self.achain_of_thought_math(question, temperature=temperature))
+
+    def math_consistency(self, question, samples: int = 5, temperature: float = 0.7):
+        return run_sync(self.amath_consistency(question, samples=samples, temperature=temperature))
+
+    def solve_math_question(self, question, max_iters: int = 2):
+        return run_sync(self.asolve_math_question(question, max_iters=max_iters))
+
+    def solve_expression_question(self, question: str) -> str:
+        return run_sync(self.asolve_expression_question(question))
+
+    def self_refinement_coding(self, question, initial: str | None = None, max_iters: int = 2):
+        return run_sync(self.aself_refinement_coding(question, initial=initial, max_iters=max_iters))
+
+    def chain_of_thought_coding(self, question: str) -> str:
+        return run_sync(self.achain_of_thought_coding(question))
+
+    def reasoning_via_planning(self, question, max_steps=10):
+        return run_sync(self.areasoning_via_planning(question, max_steps=max_steps))
+
+    def chain_of_thought(self, question: str) -> str:
+        return run_sync(self.achain_of_thought(question))
+
+    def direct_samples(self, question, samples: int = 2, temperature: float = 0.2, boxed: bool = False):
+        return run_sync(self.adirect_samples(question, samples=samples, temperature=temperature, boxed=boxed))
@@ -0,0 +1,270 @@
+"""
+Canonical forms for math answers, so equivalent answers vote together.
+
+`1/2`, `0.5`, `\\frac{1}{2}` and `$\\boxed{\\dfrac12}$` all map to the rational 1/2;
+`\\sqrt{8}` and `2\\sqrt{2}` map to the surd 2*sqrt(2); `6.02e23` and
+`6.02 \\times 10^{23}` map to the same rational. Anything that does not parse
+as arithmetic falls back to normalized text.
+
+safe_eval is a small AST-based arithmetic evaluator (no names except sqrt/pi/e,
+no attribute access, bounded exponents) that keeps results exact as Fractions
+whenever it can.
+"""
+
+import ast
+import math
+import operator
+import re
+from collections import Counter
+from fractions import Fraction
+
+_MAX_POWER = 1000
+_MAX_INT_DIGITS = 4000
+# Largest exact power result, in bits (about _MAX_INT_DIGITS decimal digits)
+_MAX_RESULT_BITS = 13300
+
+_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+_CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def _sqrt(x):
+    if isinstance(x, Fraction) and x >= 0:
+        num, den = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if num * num == x.numerator and den * den == x.denominator:
+            return Fraction(num, den)
+    return math.sqrt(x)
+
+
+_FUNCTIONS = {
+    "sqrt": _sqrt,
+    "abs": abs,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "log": math.log,
+    "exp": math.exp,
+}
+
+
+def _power(base, exp):
+    if isinstance(exp, Fraction) and exp.denominator == 1:
+        if abs(exp) > _MAX_POWER:
+            raise ValueError("exponent too large")
+        if isinstance(base, Fraction):
+            if base == 0 and exp < 0:
+                raise ZeroDivisionError("0 to a negative power")
+            # Estimate the result size before computing it: ((10**1000)**1000)**100 would never finish
+            bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+            if bits * abs(exp) > _MAX_RESULT_BITS:
+                raise ValueError("result too large")
+            return base ** int(exp)
+    if isinstance(exp, Fraction) and exp == Fraction(1, 2):
+        return _sqrt(base)
+    return float(base) ** float(exp)
+
+
+def _bounded(value):
+    # Products and sums grow too: keep every exact intermediate within _MAX_RESULT_BITS
+    if isinstance(value, Fraction) and max(value.numerator.bit_length(),
+                                           value.denominator.bit_length()) > _MAX_RESULT_BITS:
+        raise ValueError("result too large")
+    return value
+
+
+def _eval(node):
+    if isinstance(node, ast.Expression):
+        return _eval(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+            and not isinstance(node.value, bool):
+        if isinstance(node.value, int) and len(str(abs(node.value))) > _MAX_INT_DIGITS:
+            raise ValueError("number too large")
+        # Decimal literals stay exact: 0.1 -> 1/10
+        return Fraction(repr(node.value)) if isinstance(node.value, float) else Fraction(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        value = _eval(node.operand)
+        return value if isinstance(node.op, ast.UAdd) else -value
+    if isinstance(node, ast.BinOp):
+        left, right = _eval(node.left), _eval(node.right)
+        if isinstance(node.op, ast.Pow):
+            return _bounded(_power(left, right))
+        op = _BINOPS.get(type(node.op))
+        if op is None:
+            raise ValueError(f"unsupported operator {type(node.op).__name__}")
+        return _bounded(op(left, right))
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+            and node.func.id in _FUNCTIONS and len(node.args) == 1 and not node.keywords:
+        return _FUNCTIONS[node.func.id](_eval(node.args[0]))
+    raise ValueError(f"unsupported expression: {ast.dump(node)[:60]}")
+
+
+def safe_eval(expression: str):
+    """Evaluate an arithmetic expression; returns a Fraction when exact, else a float."""
+    expression = expression.replace("^", "**").replace("×", "*").replace("÷", "/").replace("−", "-")
+    if len(expression) > 500:
+        raise ValueError("expression too long")
+    return _eval(ast.parse(expression.strip(), mode="eval"))
+
+
+def clean_answer(text: str) -> str:
+    # Drop \boxed{}, $...$, \text{units}, "x =" prefixes and trailing periods
+    s = text.strip()
+    m = re.search(r"\\boxed\s*\{(.*)\}", s)
+    if m:
+        s = m.group(1)
+    s = s.strip().strip("$").strip()
+    s = re.sub(r"\\(?:text|mathrm|mbox)\s*\{[^}]*\}", "", s)   # units written as \text{cm}
+    s = re.sub(r"\\(?:left|right|,|;|!|displaystyle)", "", s)
+    s = s.replace("\\%", "").replace("%", "")
+    # "x = 3" / "n=8" -> "3"
+    s = re.sub(r"^[a-zA-Z]\w*\s*=\s*", "", s)
+    s = s.rstrip(".").strip()
+    # Plain-text units: "8 cm", "12 apples", "3.5 km/h" -> the number, when only the prefix
+    # evaluates (a single attached letter like "2x" is left alone)
+    m = re.match(r"^(.*?[\d)}$])\s*((?<=\s)[a-zA-Z]|[a-zA-Z]{2,})[a-zA-Z/^\d\s]*$", s)
+    if m and not _evaluates(s):
+        prefix = m.group(1).strip().strip("$").strip()
+        if _evaluates(prefix):
+            s = prefix
+    return s
+
+
+def _evaluates(text: str) -> bool:
+    try:
+        safe_eval(_latex_to_expression(text))
+        return True
+    except (ValueError, SyntaxError, TypeError, ZeroDivisionError, OverflowError, RecursionError):
+        return False
+
+
+def _latex_to_expression(s: str) -> str:
+    # Innermost-first, so \frac{\sqrt{3}}{2} and \sqrt{\frac{1}{2}} both unwrap
+    previous = None
+    while previous != s:
+        previous = s
+        s = re.sub(r"\\[dt]?frac\s*\{([^{}]*)\}\s*\{([^{}]*)\}", r"((\1)/(\2))", s)
+        s = re.sub(r"\\sqrt\s*\{([^{}]*)\}", r"sqrt(\1)", s)
+    s = re.sub(r"\\[dt]?frac\s*(\d)\s*(\d)", r"((\1)/(\2))", s)          # \frac12
+    s = re.sub(r"\\sqrt\s*(\d+)", r"sqrt(\1)", s)
+    s = s.replace("\\cdot", "*").replace("\\times", "*").replace("\\div", "/")
+    s = s.replace("\\pi", "pi").replace("{", "(").replace("}", ")")
+    s = re.sub(r"(?<=\d),(?=\d{3}\b)", "", s)                            # 1,000 -> 1000
+    # implicit multiplication: 2sqrt(2), 3pi, 2(3)
+    s = re.sub(r"(\d|\))\s*(?=sqrt|pi|\()", r"\1*", s)
+    return s
+
+
+def _decimals(text: str) -> int | None:
+    # Digits after the decimal point of a plain decimal answer like "0.333"
+    m = re.fullmatch(r"\s*[-+]?\d*\.(\d+)\s*", text)
+    return len(m.group(1)) if m else None
+
+
+def _surd(value: float):
+    """(coef, radicand) with value == coef * sqrt(radicand) for a small square-free radicand, else None."""
+    square = Fraction(value * value).limit_denominator(10000)
+    if square <= 0 or abs(float(square) - value * value) > 1e-9 * max(1.0, value * value):
+        return None
+    # sqrt(p/q) = sqrt(p*q)/q, then pull square factors out of p*q
+    inner, outer = square.numerator * square.denominator, Fraction(1, square.denominator)
+    k = 2
+    while k * k <= inner and k < 10000:
+        while inner % (k * k) == 0:
+            inner //= k * k
+            outer *= k
+        k += 1
+    if inner == 1 or inner > 10 ** 6:
+        return None
+    return (outer if value > 0 else -outer), inner
+
+
+def _format_rational(q: Fraction) -> str:
+    if q.denominator == 1:
+        if 10 ** 12 <= abs(q.numerator) < 10 ** 300:
+            return f"{float(q):.10g}"
+        return str(q.numerator)
+    return f"{q.numerator}/{q.denominator}"
+
+
+def canonicalize(answer: str) -> dict:
+    """
+    Map an answer to {"key", "value", "display", "decimals"}.
+    Equal keys mean equivalent answers; value is a float for numeric answers, else None.
+    """
+    raw = (answer or "").strip()
+    cleaned = clean_answer(raw)
+    try:
+        value = safe_eval(_latex_to_expression(cleaned))
+    except (ValueError, SyntaxError, TypeError, ZeroDivisionError, OverflowError, RecursionError):
+        value = None
+
+    if isinstance(value, Fraction):
+        try:
+            as_float = float(value)
+        except OverflowError:
+            as_float = None
+        return {"key": f"r:{value.numerator}/{value.denominator}", "value": as_float,
+                "display": _format_rational(value), "decimals": _decimals(cleaned)}
+
+    if isinstance(value, float) and math.isfinite(value):
+        surd = _surd(value)
+        if surd is not None:
+            coef, radicand = surd
+            display = f"{_format_rational(coef)}*sqrt({radicand})"
+            return {"key": f"s:{coef}:{radicand}", "value": value, "display": display, "decimals": None}
+        return {"key": f"f:{value:.10g}", "value": value, "display": f"{value:.10g}", "decimals": None}
+
+    text = re.sub(r"\s+", " ", cleaned.lower()).strip()
+    return {"key": f"t:{text}", "value": None, "display": cleaned, "decimals": None}
+
+
+def equivalent(a: dict, b: dict) -> bool:
+    if a["key"] == b["key"]:
+        return True
+    if a["value"] is None or b["value"] is None:
+        return False
+    x, y = a["value"], b["value"]
+    if abs(x - y) <= 1e-9 * max(1.0, abs(x), abs(y)):
+        return True
+    # A rounded decimal ("0.333") matches the exact or irrational value it rounds from,
+    # never another short decimal ("0.5" vs "0.46"), and needs at least 2 decimals
+    for short, other in ((a, b), (b, a)):
+        places = short["decimals"]
+        if places is not None and places >= 2 and other["decimals"] is None \
+                and round(other["value"], places) == round(short["value"], places):
+            return True
+    return False
+
+
+def vote(answers) -> tuple:
+    """
+    Group answers into equivalence classes.
+    Returns (best_answer, best_count, classes) where classes is a list of lists of raw answers,
+    largest first, and best_answer is the most common spelling in the largest class.
+    """
+    classes = []   # [(canonical of first member, [raw answers])]
+    for answer in answers:
+        if not answer:
+            continue
+        form = canonicalize(answer)
+        for rep, members in classes:
+            if equivalent(rep, form):
+                members.append(answer)
+                break
+        else:
+            classes.append((form, [answer]))
+
+    classes.sort(key=lambda c: len(c[1]), reverse=True)
+    if not classes:
+        return "", 0, []
+    best = Counter(classes[0][1]).most_common(1)[0][0]
+    return best, len(classes[0][1]), [members for _, members in classes]
@@ -0,0 +1,426 @@
+"""
+Local classical planner for fully specified planning questions.
+
+Parses two kinds of problem description:
+  - PDDL: a (define (domain ...)) and a (define (problem ...)) block anywhere in
+    the question (STRIPS with types, negative preconditions and equality)
+  - PlanBench blocksworld prose: "I am playing with a set of blocks ...
+    [STATEMENT] As initial conditions I have that, ... My goal is to have that ..."
+
+and searches for a plan over the ground actions with A* and then greedy
+best-first search, both guided by the FF relaxed-plan heuristic and bounded by
+a node and time budget. Plans come out one action per line, "(action arg ...)",
+or in the prose form of the question's example plans when it has them.
+
+plan_question() returns (plan, status); plan is None unless status == "solved",
+and the caller falls back to the LLM.
+"""
+
+import heapq
+import itertools
+import re
+import time
+
+MAX_NODES = 50000
+MAX_SECONDS = 5.0
+
+
+class PlanParseError(ValueError):
+    pass
+
+
+# ---- PDDL ----
+
+def _define_blocks(text: str) -> list:
+    # Balanced "(define ...)" substrings; surrounding prose may contain stray parentheses
+    blocks = []
+    for m in re.finditer(r"\(\s*define\b", text, re.IGNORECASE):
+        depth = 0
+        for i in range(m.start(), len(text)):
+            if text[i] == "(":
+                depth += 1
+            elif text[i] == ")":
+                depth -= 1
+                if depth == 0:
+                    blocks.append(text[m.start():i + 1])
+                    break
+    return blocks
+
+
+def _sexpr(text: str):
+    text = re.sub(r";[^\n]*", "", text).lower()
+    stack = [[]]
+    for token in re.findall(r"\(|\)|[^\s()]+", text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise PlanParseError("unbalanced parentheses")
+            inner = stack.pop()
+            stack[-1].append(inner)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise PlanParseError("unbalanced parentheses")
+    return stack[0][0]
+
+
+def _typed_list(items) -> list:
+    # ["a", "b", "-", "block", "c"] -> [("a", "block"), ("b", "block"), ("c", "object")]
+    out, pending, i = [], [], 0
+    while i < len(items):
+        if items[i] == "-":
+            if i + 1 >= len(items):
+                raise PlanParseError("dangling '-' in typed list")
+            kind = items[i + 1]
+            if isinstance(kind, list):   # (either t1 t2): keep the first type
+                kind = kind[1]
+            out += [(name, kind) for name in pending]
+            pending = []
+            i += 2
+        else:
+            pending.append(items[i])
+            i += 1
+    return out + [(name, "object") for name in pending]
+
+
+def _sections(expr) -> dict:
+    # (:keyword value ...) entries of a define block; :action entries are collected in a list
+    sections = {"actions": []}
+    for entry in expr[2:]:
+        if not isinstance(entry, list) or not entry or not isinstance(entry[0], str):
+            continue
+        if entry[0] == ":action":
+            sections["actions"].append(entry)
+        else:
+            sections[entry[0]] = entry[1:]
+    return sections
+
+
+def _literals(formula) -> list:
+    """Precondition/goal formula -> [(positive, atom)], atom being a tuple of strings."""
+    if not formula:
+        return []
+    head = formula[0]
+    if head == "and":
+        return [lit for part in formula[1:] for lit in _literals(part)]
+    if head == "not":
+        return [(not positive, atom) for positive, atom in _literals(formula[1])]
+    if not all(isinstance(x, str) for x in formula):
+        raise PlanParseError(f"unsupported formula: {head}")
+    if head in ("or", "imply", "forall", "exists", "when"):
+        raise PlanParseError(f"unsupported formula: {head}")
+    return [(True, tuple(formula))]
+
+
+def _effects(formula):
+    adds, dels = [], []
+    for positive, atom in _literals(formula):
+        (adds if positive else dels).append(atom)
+    return adds, dels
+
+
+class Schema:
+    def __init__(self, entry):
+        self.name = entry[1]
+        fields = dict(zip(entry[2::2], entry[3::2]))
+        self.params = _typed_list(fields.get(":parameters", []))
+        self.pre = _literals(fields.get(":precondition", []))
+        self.add, self.dels = _effects(fields.get(":effect", []))
+
+
+class GroundAction:
+    __slots__ = ("name", "args", "pre", "neg", "add", "dels")
+
+    def __init__(self, name, args, pre, neg, add, dels):
+        self.name = name
+        self.args = args
+        self.pre = pre
+        self.neg = neg
+        self.add = add
+        self.dels = dels
+
+    def __str__(self):
+        return "(" + " ".join((self.name,) + self.args) + ")"
+
+
+class Task:
+    """A grounded planning problem: initial state, goal literals and ground actions."""
+
+    def __init__(self, domain: str, problem: str):
+        dom, prob = _sections(_sexpr(domain)), _sections(_sexpr(problem))
+        self.schemas = [Schema(entry) for entry in dom["actions"]]
+        if not self.schemas:
+            raise PlanParseError("domain has no actions")
+
+        parents = dict(_typed_list(dom.get(":types", [])))
+        objects = _typed_list(dom.get(":constants", [])) + _typed_list(prob.get(":objects", []))
+        self.by_type = {}
+        for name, kind in objects:
+            seen = set()
+            while kind not in seen:   # register under the type and all its ancestors
+                seen.add(kind)
+                self.by_type.setdefault(kind, []).append(name)
+                kind = parents.get(kind, "object")
+        self.by_type["object"] = sorted({name for name, _ in objects})
+
+        self.init = frozenset(tuple(f) for f in prob.get(":init", [])
+                              if all(isinstance(x, str) for x in f) and f[0] != "=")
+        goal = _literals(prob.get(":goal", [[]])[0])
+        self.goal = frozenset(atom for positive, atom in goal if positive)
+        self.goal_neg = frozenset(atom for positive, atom in goal if not positive)
+
+        fluents = {atom[0] for s in self.schemas for atom in s.add + s.dels}
+        self.actions = [a for s in self.schemas for a in self._ground(s, fluents)]
+
+    def _ground(self, schema, fluents):
+        params = [name for name, _ in schema.params]
+        domains = [self.by_type.get(kind, []) for _, kind in schema.params]
+        # Static literals (predicates no action changes) and equalities prune grounding early
+        checks = [[] for _ in range(max(len(params), 1))]
+        dynamic = []
+        for positive, atom in schema.pre:
+            if atom[0] != "=" and atom[0] in fluents:
+                dynamic.append((positive, atom))
+                continue
+            last = max([params.index(t) for t in atom[1:] if t in params], default=0)
+            checks[last].append((positive, atom))
+
+        def holds(positive, atom, binding):
+            args = tuple(binding.get(t, t) for t in atom[1:])
+            if atom[0] == "=":
+                return (args[0] == args[1]) == positive
+            return ((atom[0],) + args in self.init) == positive
+
+        def bind(atom, binding):
+            return (atom[0],) + tuple(binding.get(t, t) for t in atom[1:])
+
+        def assign(i, binding):
+            if i == len(params):
+                yield GroundAction(
+                    schema.name, tuple(binding[p] for p in params),
+                    frozenset(bind(a, binding) for pos, a in dynamic if pos),
+                    frozenset(bind(a, binding) for pos, a in dynamic if not pos),
+                    frozenset(bind(a, binding) for a in schema.add),
+                    frozenset(bind(a, binding) for a in schema.dels))
+                return
+            for obj in domains[i]:
+                binding[params[i]] = obj
+                if all(holds(pos, atom, binding) for pos, atom in checks[i]):
+                    yield from assign(i + 1, binding)
+            binding.pop(params[i], None)
+
+        if not params:
+            if all(holds(pos, atom, {}) for pos, atom in checks[0]):
+                yield from assign(0, {})
+            return
+        yield from assign(0, {})
+
+
+# ---- Search ----
+
+def _relaxed_plan_size(state, goal, actions, by_pre, no_pre) -> float:
+    """FF heuristic: size of a plan for the delete relaxation, inf if the goal is unreachable."""
+    achiever = dict.fromkeys(state)
+    missing = [len(a.pre) for a in actions]
+    queue = list(state)
+    for i in no_pre:
+        for fact in actions[i].add:
+            if fact not in achiever:
+                achiever[fact] = i
+                queue.append(fact)
+    for fact in queue:   # grows while iterating: breadth-first fact layers
+        for i in by_pre.get(fact, ()):
+            missing[i] -= 1
+            if missing[i] == 0:
+                for new in actions[i].add:
+                    if new not in achiever:
+                        achiever[new] = i
+                        queue.append(new)
+
+    chosen = set()
+    stack = list(goal)
+    while stack:
+        fact = stack.pop()
+        if fact not in achiever:
+            return float("inf")
+        i = achiever[fact]
+        if i is None or i in chosen:
+            continue
+        chosen.add(i)
+        stack.extend(actions[i].pre)
+    return len(chosen)
+
+
+def search(task: Task, strategy: str = "astar", max_nodes: int = MAX_NODES,
+           max_seconds: float = MAX_SECONDS):
+    """Returns (plan as a list of GroundAction, status) with status "solved", "exhausted" or "unsolvable"."""
+    actions = task.actions
+    by_pre, no_pre = {}, []
+    for i, action in enumerate(actions):
+        for fact in action.pre:
+            by_pre.setdefault(fact, []).append(i)
+        if not action.pre:
+            no_pre.append(i)
+
+    def is_goal(state):
+        return task.goal <= state and not (task.goal_neg & state)
+
+    deadline = time.monotonic() + max_seconds
+    tie = itertools.count()
+    start = task.init
+    h0 = _relaxed_plan_size(start, task.goal, actions, by_pre, no_pre)
+    if h0 == float("inf"):
+        return None, "unsolvable"
+
+    frontier = [(h0, h0, next(tie), start)]
+    parent = {start: None}
+    cost = {start: 0}
+    expanded = 0
+    while frontier:
+        _, _, _, state = heapq.heappop(frontier)
+        if is_goal(state):
+            plan = []
+            while parent[state] is not None:
+                state, action = parent[state]
+                plan.append(action)
+            return plan[::-1], "solved"
+
+        expanded += 1
+        if expanded > max_nodes or (expanded % 64 == 0 and time.monotonic() > deadline):
+            return None, "exhausted"
+
+        g = cost[state] + 1
+        for action in actions:
+            if not action.pre <= state or action.neg & state:
+                continue
+            child = (state - action.dels) | action.add
+            if child in cost and cost[child] <= g:
+                continue
+            h = _relaxed_plan_size(child, task.goal, actions, by_pre, no_pre)
+            if h == float("inf"):
+                continue
+            cost[child] = g
+            parent[child] = (state, action)
+            priority = g + h if strategy == "astar" else h
+            heapq.heappush(frontier, (priority, h, next(tie), child))
+    return None, "unsolvable"
+
+
+# ---- PlanBench blocksworld prose ----
+
+BLOCKSWORLD_DOMAIN = """
+(define (domain blocksworld)
+  (:predicates (clear ?x) (ontable ?x) (handempty) (holding ?x) (on ?x ?y))
+  (:action pick-up
+    :parameters (?ob)
+    :precondition (and (clear ?ob) (ontable ?ob) (handempty))
+    :effect (and (holding ?ob) (not (clear ?ob)) (not (ontable ?ob)) (not (handempty))))
+  (:action put-down
+    :parameters (?ob)
+    :precondition (holding ?ob)
+    :effect (and (clear ?ob) (handempty) (ontable ?ob) (not (holding ?ob))))
+  (:action stack
+    :parameters (?ob ?underob)
+    :precondition (and (clear ?underob) (holding ?ob))
+    :effect (and (handempty) (clear ?ob) (on ?ob ?underob) (not (clear ?underob)) (not (holding ?ob))))
+  (:action unstack
+    :parameters (?ob ?underob)
+    :precondition (and (on ?ob ?underob) (clear ?ob) (handempty))
+    :effect (and (holding ?ob) (clear ?underob) (not (on ?ob ?underob)) (not (clear ?ob)) (not (handempty)))))
+"""
+
+_BLOCK_FACTS = [
+    (r"the (\w+) block is clear", "clear"),
+    (r"the hand is empty", "handempty"),
+    (r"the (\w+) block is on top of the (\w+) block", "on"),
+    (r"the (\w+) block is on the table", "ontable"),
+    (r"(?:the hand is|i am) holding the (\w+) block", "holding"),
+]
+
+_BLOCK_PROSE = {
+    "pick-up": "pick up the {0} block",
+    "put-down": "put down the {0} block",
+    "stack": "stack the {0} block on top of the {1} block",
+    "unstack": "unstack the {0} block from on top of the {1} block",
+}
+
+
+def _block_facts(text: str) -> list:
+    facts = []
+    for clause in re.split(r",\s*(?:and\s+)?|\s+and\s+", text.strip().rstrip(".").lower()):
+        clause = clause.strip()
+        if not clause:
+            continue
+        for pattern, predicate in _BLOCK_FACTS:
+            m = re.fullmatch(pattern, clause)
+            if m:
+                facts.append((predicate,) + m.groups())
+                break
+        else:
+            raise PlanParseError(f"unrecognized blocksworld fact: {clause!r}")
+    return facts
+
+
+def _blocksworld_problem(question: str):
+    """PDDL problem text for the last [STATEMENT] of a blocksworld prompt, plus its example plan style."""
+    statement = re.split(r"\[STATEMENT\]", question)[-1]
+    m = re.search(r"I have that,?(.*?)My goal is to have that(.*?)(?:My plan is|\[PLAN|$)",
+                  statement, re.IGNORECASE | re.DOTALL)
+    if not m:
+        raise PlanParseError("no initial conditions / goal in statement")
+    init, goal = _block_facts(m.group(1)), _block_facts(m.group(2))
+    blocks = sorted({arg for fact in init + goal for arg in fact[1:]})
+
+    def atoms(facts):
+        return " ".join("(" + " ".join(fact) + ")" for fact in facts)
+
+    problem = (f"(define (problem statement) (:domain blocksworld) (:objects {' '.join(blocks)}) "
+               f"(:init {atoms(init)}) (:goal (and {atoms(goal)})))")
+
+    examples = re.findall(r"\[PLAN\](.*?)\[PLAN END\]", question, re.DOTALL)
+    first = next((line.strip() for block in examples for line in block.splitlines() if line.strip()), "(")
+    return problem, not first.startswith("(")
+
+
+# ---- Entry point ----
+
+def parse_question(question: str):
+    """(Task, prose) for a planning question, or raise PlanParseError."""
+    blocks = _define_blocks(question)
+    domain = next((b for b in blocks if re.match(r"\(\s*define\s*\(\s*domain", b, re.IGNORECASE)), None)
+    problem = next((b for b in blocks if re.match(r"\(\s*define\s*\(\s*problem", b, re.IGNORECASE)), None)
+    if domain and problem:
+        return Task(domain, problem), False
+    if re.search(r"playing with a set of blocks", question, re.IGNORECASE):
+        problem, prose = _blocksworld_problem(question)
+        return Task(BLOCKSWORLD_DOMAIN, problem), prose
+    raise PlanParseError("no PDDL domain/problem or known prose format")
+
+
+def format_plan(plan, prose: bool = False) -> str:
+    if prose:
+        return "\n".join(_BLOCK_PROSE[a.name].format(*a.args) for a in plan)
+    return "\n".join(str(a) for a in plan)
+
+
+def plan_question(question: str, max_nodes: int = MAX_NODES, max_seconds: float = MAX_SECONDS):
+    """Returns (plan text, status); status is "solved", "unparsed", "exhausted" or "unsolvable"."""
+    try:
+        task, prose = parse_question(question)
+    except (PlanParseError, IndexError, KeyError) as e:
+        print(f"[Planner] Could not parse problem: {e}")
+        return None, "unparsed"
+
+    # A* for short plans first, then greedy best-first with the rest of the budget
+    started = time.monotonic()
+    plan, status = search(task, "astar", max_nodes // 2, max_seconds / 2)
+    if status == "exhausted":
+        remaining = max(max_seconds - (time.monotonic() - started), 0.1)
+        plan, status = search(task, "gbfs", max_nodes // 2, remaining)
+
+    print(f"[Planner] {status} with {len(task.actions)} ground actions"
+          + (f", plan length {len(plan)}" if plan is not None else ""))
+    if plan is None:
+        return None, status
+    return format_plan(plan, prose), status
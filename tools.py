@@ -0,0 +1,202 @@
+"""
+Local tools for ReAct actions, so observations come from real lookups instead
+of another model call.
+
+    Calculate[expression]   exact arithmetic with math_answers.safe_eval
+    Search[query]           best-matching passages from a SQLite FTS5 index
+    Lookup[topic]           opening passage of the article titled `topic`
+                            (falls back to Search)
+
+Build an index from an offline text dump with
+
+    python tools.py dump.txt index.db
+
+The dump can be JSONL ({"title", "text"} per line), WikiExtractor output
+(<doc ... title="..."> blocks) or plain text with blank-line separated
+paragraphs. Enable it with tools.use_index(path) or REACT_INDEX=index.db;
+without an index only Calculate runs locally.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from fractions import Fraction
+
+from math_answers import safe_eval
+
+ACTION_RE = re.compile(r"\b(Search|Calculate|Lookup)\s*\[([^\[\]\n]+)\]", re.IGNORECASE)
+
+# Passages are cut at paragraph boundaries to about this many characters
+PASSAGE_CHARS = 1200
+SEARCH_RESULTS = 2
+
+_STOPWORDS = {"a", "an", "the", "of", "in", "on", "at", "to", "for", "and", "or", "is", "are",
+              "was", "were", "be", "by", "with", "what", "who", "when", "where", "which", "how",
+              "did", "does", "do", "from", "as", "that", "this"}
+
+
+def parse_actions(text: str) -> list:
+    """[(tool, argument)] for every Search/Calculate/Lookup call in the text, in order."""
+    return [(m.group(1).capitalize(), m.group(2).strip()) for m in ACTION_RE.finditer(text or "")]
+
+
+def calculate(expression: str) -> str | None:
+    """Exact value of an arithmetic expression, or None if it does not evaluate (e.g. prose)."""
+    expr = expression.strip().rstrip("?=").strip()
+    expr = re.sub(r"(?<=\d),(?=\d{3}\b)", "", expr)     # 1,000 -> 1000
+    # Model-written text: formatting a huge value can fail too, so it stays inside the guard
+    try:
+        value = safe_eval(expr)
+        if isinstance(value, Fraction):
+            if value.denominator == 1:
+                return str(value.numerator)
+            return f"{value.numerator}/{value.denominator} (≈ {float(value):.10g})"
+        return f"{value:.10g}"
+    except (ValueError, SyntaxError, TypeError, ZeroDivisionError, OverflowError, RecursionError):
+        return None
+
+
+def _match_query(text: str) -> str | None:
+    # FTS5 query: any of the content words, quoted so punctuation cannot break the syntax
+    words = [w for w in re.findall(r"\w+", text.lower()) if w not in _STOPWORDS]
+    return " OR ".join(f'"{w}"' for w in words) if words else None
+
+
+def _read_dump(path):
+    """Yield (title, text) documents from a JSONL, WikiExtractor or plain text dump."""
+    with open(path, encoding="utf-8") as fp:
+        first = fp.readline()
+        fp.seek(0)
+        if first.lstrip().startswith("{"):
+            for line in fp:
+                if line.strip():
+                    doc = json.loads(line)
+                    yield doc.get("title", ""), doc.get("text") or doc.get("body") or doc.get("contents", "")
+            return
+
+        title, lines = "", []
+        for line in fp:
+            m = re.match(r'\s*<doc\b[^>]*\btitle="([^"]*)"', line)
+            if m:
+                title, lines = m.group(1), []
+            elif line.strip() == "</doc>":
+                yield title, "".join(lines)
+                title, lines = "", []
+            elif title:
+                lines.append(line)
+            elif not line.strip():
+                if lines:
+                    yield "", "".join(lines)
+                lines = []
+            else:
+                lines.append(line)
+        if lines:
+            yield title, "".join(lines)
+
+
+def _passages(text: str):
+    current = ""
+    for para in re.split(r"\n\s*\n", text.strip()):
+        para = " ".join(para.split())
+        if current and len(current) + len(para) > PASSAGE_CHARS:
+            yield current
+            current = ""
+        current = f"{current}\n{para}" if current else para
+    if current:
+        yield current
+
+
+class KnowledgeIndex:
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, dump_path, index_path) -> "KnowledgeIndex":
+        index = cls(index_path)
+        with index._lock, index._conn:
+            conn = index._conn
+            conn.execute("DROP TABLE IF EXISTS docs")
+            conn.execute("CREATE VIRTUAL TABLE docs USING fts5(title, body)")
+            conn.executemany("INSERT INTO docs (title, body) VALUES (?, ?)",
+                             ((title, passage) for title, text in _read_dump(dump_path)
+                              for passage in _passages(text)))
+        return index
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM docs").fetchone()[0]
+
+    def search(self, query: str, k: int = SEARCH_RESULTS) -> list:
+        match = _match_query(query)
+        if match is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title, snippet(docs, 1, '', '', ' ... ', 48) FROM docs "
+                "WHERE docs MATCH ? ORDER BY rank LIMIT ?", (match, k)).fetchall()
+        return [f"{title}: {text}" if title else text for title, text in rows]
+
+    def lookup(self, topic: str) -> str | None:
+        phrase = topic.strip().replace('"', "")
+        if not phrase:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, body FROM docs WHERE docs MATCH ? AND lower(title) = lower(?) "
+                "ORDER BY rowid LIMIT 1", (f'title : "{phrase}"', phrase)).fetchone()
+        if row is None:
+            hits = self.search(topic, k=1)
+            return hits[0] if hits else None
+        # The opening sentences of the article
+        sentences = re.split(r"(?<=[.!?])\s+", row[1])
+        return f"{row[0]}: " + " ".join(sentences[:3])
+
+
+# Active index for Search/Lookup, if any
+_index = None
+
+
+def use_index(path):
+    """Answer Search/Lookup from the FTS5 index at path; path=None turns it off."""
+    global _index
+    _index = KnowledgeIndex(path) if path else None
+    return _index
+
+
+if os.getenv("REACT_INDEX"):
+    use_index(os.environ["REACT_INDEX"])
+
+
+def run_action(tool: str, argument: str) -> str | None:
+    """Observation for one action, or None when the local tools have nothing for it."""
+    if tool == "Calculate":
+        return calculate(argument)
+    if _index is None:
+        return None
+    try:
+        if tool == "Lookup":
+            return _index.lookup(argument)
+        hits = _index.search(argument)
+        return "\n".join(hits) if hits else None
+    except sqlite3.Error as e:
+        print(f"[Tools] {tool}[{argument}] failed: {e}")
+        return None
+
+
+def execute(text: str, max_actions: int = 4) -> list:
+    """[(action, observation or None)] for the first max_actions actions in text."""
+    return [(f"{tool}[{argument}]", run_action(tool, argument))
+            for tool, argument in parse_actions(text)[:max_actions]]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python tools.py <dump.txt|dump.jsonl> <index.db>")
+        sys.exit(1)
+    index = KnowledgeIndex.build(sys.argv[1], sys.argv[2])
+    print(f"Indexed {len(index)} passages into {sys.argv[2]}")
@@ -0,0 +1,173 @@
+"""
+Lightweight span tracing that writes Chrome trace-event JSON (open in
+chrome://tracing or https://ui.perfetto.dev).
+
+    import tracing
+    tracing.enable()
+    with tracing.span("question", qtype="math") as sp:
+        ...
+        sp.set(tokens=123)
+    tracing.save("trace.json")
+
+Setting TRACE_FILE=<path> enables tracing at import and saves on exit.
+When disabled, span() returns a shared no-op object, so instrumented code
+pays for one global check per span.
+
+Spans nest through a ContextVar, so they follow asyncio tasks. Each trace
+lane (tid) holds properly nested spans; a span that starts while its parent's
+lane is busy with a sibling (e.g. concurrent consistency samples) gets a new lane.
+"""
+
+import asyncio
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+_enabled = False
+_events = []
+_lock = threading.Lock()
+_lanes = itertools.count(1)
+_t0 = time.perf_counter_ns()
+_current = ContextVar("trace_span", default=None)
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "tid", "busy", "_start", "_token", "_parent")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.busy = False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None and not parent.busy:
+            self.tid = parent.tid
+            parent.busy = True
+            self._parent = parent
+        else:
+            self.tid = next(_lanes)
+            self._parent = None
+        self._token = _current.set(self)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        _current.reset(self._token)
+        if self._parent is not None:
+            self._parent.busy = False
+        if exc_type is asyncio.CancelledError:
+            self.attrs.setdefault("status", "cancelled")
+        elif exc_type is not None:
+            self.attrs.setdefault("status", "error")
+            self.attrs.setdefault("error", f"{exc_type.__name__}: {exc}")
+
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": (self._start - _t0) / 1000,
+            "dur": (end - self._start) / 1000,
+            "pid": os.getpid(),
+            "tid": self.tid,
+            "args": {k: v if isinstance(v, (int, float, bool, str)) or v is None else str(v)
+                     for k, v in self.attrs.items()},
+        }
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def span(name: str, **attrs):
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def current_span():
+    # The innermost open span, or a no-op object when tracing is off
+    if not _enabled:
+        return _NOOP
+    return _current.get() or _NOOP
+
+
+def traced(name: str | None = None):
+    """Decorator wrapping a function or coroutine function in a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with Span(span_name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear():
+    with _lock:
+        _events.clear()
+
+
+def save(path) -> int:
+    """Write collected spans as Chrome trace JSON; returns the number of events."""
+    with _lock:
+        events = list(_events)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp)
+    return len(events)
+
+
+if os.getenv("TRACE_FILE"):
+    enable()
+    atexit.register(lambda: print(f"[Tracing] Wrote {save(os.environ['TRACE_FILE'])} spans "
+                                  f"to {os.environ['TRACE_FILE']}"))
@@ -1,16 +1,60 @@
 import os, json, textwrap, re, time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
+from cassette import Cassette
+from concurrency import AdaptiveLimiter
+from tracing import span
+
+try:
+    import aiohttp
+except ImportError:  # optional: async calls fall back to a worker thread
+    aiohttp = None
+
 API_KEY  = os.getenv("OPENAI_API_KEY", "cse476")
 API_BASE = os.getenv("API_BASE", "http://10.4.58.53:41701/v1")
 MODEL    = os.getenv("MODEL_NAME", "bens_model")
 
-def call_model_chat_completions(prompt: str,
-                                system: str = "You are a helpful assistant. Reply with only the final answer—no explanation.",
-                                model: str = MODEL,
-                                temperature: float = 0.0,
-                                timeout: int = 60) -> dict:
+# Active record/replay cassette, if any (see cassette.py)
+_cassette = None
+
+
+def use_cassette(path, mode: str = "replay", strict: bool = False, latency: float = 0.0):
+    """Route model calls through a record/replay cassette; path=None turns it off."""
+    global _cassette
+    _cassette = Cassette(path, mode=mode, strict=strict, latency=latency) if path else None
+    return _cassette
+
+
+if os.getenv("CASSETTE_PATH"):
+    use_cassette(os.environ["CASSETTE_PATH"],
+                 mode=os.getenv("CASSETTE_MODE", "replay"),
+                 strict=os.getenv("CASSETTE_STRICT", "0") == "1",
+                 latency=float(os.getenv("CASSETTE_LATENCY", "0")))
+
+# Adaptive limit on in-flight async requests, if any (see concurrency.py)
+_limiter = None
+
+
+def use_limiter(initial: int = 8, min_limit: int = 1, max_limit: int = 256):
+    """Cap in-flight async model calls with an AIMD limiter; initial=None turns it off."""
+    global _limiter
+    _limiter = AdaptiveLimiter(initial, min_limit, max_limit) if initial else None
+    return _limiter
+
+
+if os.getenv("ADAPTIVE_CONCURRENCY", "0") == "1":
+    use_limiter(initial=int(os.getenv("ADAPTIVE_CONCURRENCY_START", "8")),
+                max_limit=int(os.getenv("ADAPTIVE_CONCURRENCY_MAX", "256")))
 
+# Extra body fields that make the server continue a trailing assistant message
+# instead of starting a new turn (vLLM chat-template options)
+PREFILL_EXTRA_BODY = {"continue_final_message": True, "add_generation_prompt": False}
+
+
+def _build_request(prompt: str, system: str, model: str, temperature: float,
+                   messages: list | None = None, max_tokens: int = 900):
     url = f"{API_BASE}/chat/completions"
     headers = {
         "Authorization": f"Bearer {API_KEY}",
@@ -18,31 +62,181 @@ def call_model_chat_completions(prompt: str,
     }
     payload = {
         "model": model,
-        "messages": [
+        "messages": messages or [
             {"role": "system", "content": system},
             {"role": "user",   "content": prompt}
         ],
         "temperature": temperature,
-        "max_tokens": 900,
+        "max_tokens": max_tokens,
     }
+    if messages and messages[-1]["role"] == "assistant":
+        payload.update(PREFILL_EXTRA_BODY)
+    return url, headers, payload
+
+
+def _ok_result(data: dict, status: int, hdrs: dict) -> dict:
+    choice = data.get("choices", [{}])[0]
+    text = choice.get("message", {}).get("content", "")
+    return {"ok": True, "text": text, "raw": data, "status": status, "error": None, "headers": hdrs,
+            "finish_reason": choice.get("finish_reason")}
 
+
+def _error_result(status: int, error, hdrs: dict) -> dict:
+    return {"ok": False, "text": None, "raw": None, "status": status, "error": str(error), "headers": hdrs,
+            "finish_reason": None}
+
+
+def _post(url: str, headers: dict, payload: dict, timeout: int) -> dict:
     try:
         resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
         status = resp.status_code
         hdrs   = dict(resp.headers)
         if status == 200:
-            data = resp.json()
-            text = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            return {"ok": True, "text": text, "raw": data, "status": status, "error": None, "headers": hdrs}
+            return _ok_result(resp.json(), status, hdrs)
         else:
             err_text = None
             try:
                 err_text = resp.json()
             except Exception:
                 err_text = resp.text
-            return {"ok": False, "text": None, "raw": None, "status": status, "error": str(err_text), "headers": hdrs}
+            return _error_result(status, err_text, hdrs)
     except requests.RequestException as e:
-        return {"ok": False, "text": None, "raw": None, "status": -1, "error": str(e), "headers": {}}
+        return _error_result(-1, e, {})
+
+
+def _annotate_span(sp, result: dict) -> None:
+    usage = (result.get("raw") or {}).get("usage") or {}
+    sp.set(status=result.get("status"),
+           prompt_tokens=usage.get("prompt_tokens"),
+           completion_tokens=usage.get("completion_tokens"),
+           finish_reason=result.get("finish_reason"))
+
+
+def call_model_chat_completions(prompt: str,
+                                system: str = "You are a helpful assistant. Reply with only the final answer—no explanation.",
+                                model: str = MODEL,
+                                temperature: float = 0.0,
+                                timeout: int = 60,
+                                messages: list | None = None,
+                                max_tokens: int = 900) -> dict:
+
+    url, headers, payload = _build_request(prompt, system, model, temperature, messages, max_tokens)
+
+    with span("chat_completion", temperature=temperature) as sp:
+        hit = _cassette.lookup(payload) if _cassette is not None else None
+        if hit is not None:
+            result, delay = hit
+            if delay:
+                time.sleep(delay)
+            sp.set(cassette="hit")
+        else:
+            start = time.perf_counter()
+            result = _post(url, headers, payload, timeout)
+            if _cassette is not None:
+                _cassette.record(payload, result, time.perf_counter() - start)
+        _annotate_span(sp, result)
+    return result
+
+
+# One shared aiohttp session per event loop, so hundreds of in-flight
+# requests reuse the same connection pool instead of one thread each.
+_async_sessions = {}
+
+
+def _get_async_session():
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+async def _apost(url: str, headers: dict, payload: dict, timeout: int) -> dict:
+    if aiohttp is None:
+        return await asyncio.to_thread(_post, url, headers, payload, timeout)
+
+    try:
+        session = _get_async_session()
+        async with session.post(url, headers=headers, json=payload,
+                                timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            status = resp.status
+            hdrs   = dict(resp.headers)
+            if status == 200:
+                return _ok_result(await resp.json(content_type=None), status, hdrs)
+            err_text = await resp.text()
+            try:
+                err_text = json.loads(err_text)
+            except ValueError:
+                pass
+            return _error_result(status, err_text, hdrs)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return _error_result(-1, str(e) or "timeout", {})
+
+
+async def call_model_chat_completions_async(prompt: str,
+                                            system: str = "You are a helpful assistant. Reply with only the final answer—no explanation.",
+                                            model: str = MODEL,
+                                            temperature: float = 0.0,
+                                            timeout: int = 60,
+                                            messages: list | None = None,
+                                            max_tokens: int = 900) -> dict:
+    """
+    Coroutine version of call_model_chat_completions with the same return dict.
+    Uses aiohttp when installed, otherwise runs the blocking client in a worker thread.
+    `messages` replaces the system/prompt pair with a full history; a trailing
+    assistant message is continued (prefill) rather than answered.
+    """
+    url, headers, payload = _build_request(prompt, system, model, temperature, messages, max_tokens)
+
+    with span("chat_completion", temperature=temperature) as sp:
+        hit = _cassette.lookup(payload) if _cassette is not None else None
+        if hit is not None:
+            result, delay = hit
+            if delay:
+                await asyncio.sleep(delay)
+            sp.set(cassette="hit")
+        else:
+            if _limiter is not None:
+                await _limiter.acquire()
+                sp.set(concurrency_limit=int(_limiter.limit))
+            start = time.perf_counter()
+            result = None
+            try:
+                result = await _apost(url, headers, payload, timeout)
+            finally:
+                if _limiter is not None:
+                    _limiter.release(time.perf_counter() - start, result)
+            if _cassette is not None:
+                _cassette.record(payload, result, time.perf_counter() - start)
+        _annotate_span(sp, result)
+    return result
+
+
+async def _run_and_close(coro):
+    try:
+        return await coro
+    finally:
+        await close_async_session()
+
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from blocking code.
+    Inside an already running loop (e.g. Jupyter) it runs on a private loop in a worker thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_and_close(coro))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, _run_and_close(coro)).result()
 
 tests = [
     {
@@ -106,6 +300,26 @@ def grade(expected: str, got: str, kind: str) -> bool:
     else:
         return normalize_text(got) == normalize_text(expected)
 
+def loose_match(expected: str, got: str) -> bool:
+    # Normalized equality, or the expected answer appearing inside the prediction
+    exp, ans = normalize_text(expected), normalize_text(got)
+    return bool(exp) and (exp == ans or exp in ans)
+
+def load_dev_data(path, domain: str | None = None, limit: int | None = None):
+    """
+    Load development data rows as {domain, input, expected_output}.
+    Falls back to the built-in `tests` when the file is missing.
+    """
+    if not os.path.exists(path):
+        print(f"{path} not found, using the built-in tests instead")
+        rows = [{"domain": t["id"], "input": t["prompt"], "expected_output": t["expected"]} for t in tests]
+    else:
+        with open(path, "r", encoding="utf-8") as fp:
+            rows = json.load(fp)
+        if domain:
+            rows = [r for r in rows if domain in str(r.get("domain", "")).lower()]
+    return rows[:limit] if limit else rows
+
 def evaluate_tests(tests, model=MODEL):
     rows = []
     for t in tests: